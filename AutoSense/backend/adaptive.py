@@ -0,0 +1,62 @@
+import os, time
+
+FAST_INTERVAL = float(os.environ.get("AUTOSENSE_FAST_INTERVAL", 0.1))
+# Seconds of fast sampling per threshold crossing; levels like a nearly
+# full disk can stay high for days
+THRESHOLD_HOLD = float(os.environ.get("AUTOSENSE_THRESHOLD_HOLD", 60))
+
+# metric -> (enter at or above, leave below); the gap is the hysteresis band
+THRESHOLDS = {
+    "cpu": (90.0, 75.0),
+    "ram": (90.0, 85.0),
+    "disk": (95.0, 93.0),
+}
+
+
+class AdaptiveRate:
+    """Chooses the sampling interval from recent anomalies and thresholds.
+
+    Any anomaly switches straight to `fast`, and so does crossing a
+    threshold, for at most `threshold_hold` seconds per crossing. Once
+    everything has been quiet for `hold` seconds the interval doubles
+    every `hold` seconds until it is back at `idle`. Thresholds only clear
+    (and re-arm) once the metric drops below their lower bound, so a value
+    hovering at the limit doesn't flap the rate.
+    """
+
+    def __init__(self, idle, fast=FAST_INTERVAL, hold=10.0, threshold_hold=THRESHOLD_HOLD,
+                 thresholds=THRESHOLDS, clock=time.monotonic):
+        self.idle = idle
+        self.fast = min(fast, idle)
+        self.hold = hold
+        self.threshold_hold = threshold_hold
+        self.thresholds = thresholds
+        self.clock = clock
+
+        self.interval = idle
+        self.active = {}  # metric -> when it crossed its threshold
+        self._quiet_since = None
+
+    def update(self, stats, anomaly):
+        now = self.clock()
+        for metric, (high, low) in self.thresholds.items():
+            value = stats.get(metric)
+            if value is None:
+                continue
+            if value >= high:
+                self.active.setdefault(metric, now)
+            elif value < low:
+                self.active.pop(metric, None)
+
+        crossed = any(now - since < self.threshold_hold for since in self.active.values())
+        if anomaly or crossed:
+            self.interval = self.fast
+            self._quiet_since = now
+        elif self.interval < self.idle:
+            if self._quiet_since is None:
+                self._quiet_since = now
+            elif now - self._quiet_since >= self.hold:
+                self.interval = min(self.interval * 2, self.idle)
+                self._quiet_since = now
+
+        return self.interval
@@ -1,26 +1,339 @@
-import sqlite3
-import pandas as pd
-from sklearn.ensemble import IsolationForest
+import math, os, pickle, threading, time
+from collections import OrderedDict
+import numpy as np
+import storage
+import archive
+from ring import ring
+from database import METRICS
+from storage import format_timestamp
+import selfmon
+
+WINDOW = int(os.environ.get("AUTOSENSE_TRAIN_WINDOW", 1000))
+REFIT_INTERVAL = float(os.environ.get("AUTOSENSE_REFIT_SECONDS", 300))
+MIN_SAMPLES = 30
+
+# Any metric a collector produces can be a feature; extras are read back
+# from metric_samples and forward-filled onto the raw sample rows
+FEATURES = tuple(f for f in os.environ.get("AUTOSENSE_FEATURES", ",".join(METRICS)).split(",") if f)
+EXTRA_LOOKBACK = 300
+
+MODEL_PATH = os.environ.get("AUTOSENSE_MODEL_PATH", os.path.join(os.path.dirname(storage.DB_PATH), "autosense_model.pkl"))
+# Bump whenever a detector's pickled attributes or the feature set change
+MODEL_SCHEMA = 2
+
+
+class EWMADetector:
+    """Streaming z-score against an exponentially weighted mean/variance.
+
+    Scoring and updating are O(1) per sample. `fit` re-seeds the running
+    statistics from a window so a fresh detector is useful immediately.
+    """
+
+    def __init__(self, alpha=0.05, threshold=4.0, min_std=1.0):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_std = min_std
+        self.mean = None
+        self.var = None
+        self.n = 0
+        self.version = 0  # bumped whenever the statistics change
+
+    def fit(self, X):
+        self.mean = [float(v) for v in X.mean(axis=0)]
+        self.var = [float(v) for v in X.var(axis=0)]
+        self.n = len(X)
+        self.version += 1
+        return self
+
+    def needs_fit(self):
+        return self.n < MIN_SAMPLES
+
+    def update(self, x):
+        if self.mean is None:
+            self.mean = list(x)
+            self.var = [0.0] * len(x)
+        else:
+            for i, v in enumerate(x):
+                diff = v - self.mean[i]
+                incr = self.alpha * diff
+                self.mean[i] += incr
+                self.var[i] = (1 - self.alpha) * (self.var[i] + diff * incr)
+        self.n += 1
+        self.version += 1
+
+    def score(self, x):
+        if self.n < MIN_SAMPLES:
+            return 0.0
+        return max(
+            abs(v - m) / max(math.sqrt(s), self.min_std)
+            for v, m, s in zip(x, self.mean, self.var)
+        )
+
+    def predict(self, x):
+        return 1 if self.score(x) > self.threshold else 0
+
+    def predict_batch(self, X):
+        if self.n < MIN_SAMPLES:
+            return np.zeros(len(X), dtype=np.int8)
+        std = np.maximum(np.sqrt(self.var), self.min_std)
+        z = np.abs(X - np.asarray(self.mean)) / std
+        return (z.max(axis=1) > self.threshold).astype(np.int8)
+
+
+class IsolationForestDetector:
+    """IsolationForest refitted periodically on a sliding window."""
+
+    def __init__(self, contamination=0.1):
+        self.contamination = contamination
+        self.model = None
+        self.version = 0
+
+    def fit(self, X):
+        from sklearn.ensemble import IsolationForest
+        self.model = IsolationForest(contamination=self.contamination).fit(X)
+        self.version += 1
+        return self
+
+    def needs_fit(self):
+        return True
+
+    def update(self, x):
+        # Learns only through periodic refits
+        pass
+
+    def predict(self, x):
+        if self.model is None:
+            return 0
+        return 1 if self.model.predict([x])[0] == -1 else 0
+
+    def predict_batch(self, X):
+        if self.model is None or not len(X):
+            return np.zeros(len(X), dtype=np.int8)
+        return (self.model.predict(X) == -1).astype(np.int8)
+
+
+DETECTORS = {
+    "ewma": EWMADetector,
+    "iforest": IsolationForestDetector,
+}
+
+_kind = os.environ.get("AUTOSENSE_DETECTOR", "ewma")
+if _kind not in DETECTORS:
+    raise ValueError(f"Unknown AUTOSENSE_DETECTOR {_kind!r}, expected one of {', '.join(DETECTORS)}")
+
+# Replaced wholesale by the trainer; readers just grab the current reference
+detector = DETECTORS[_kind]()
+model_info = {"source": "untrained"}
+_trainer = None
+_stop = threading.Event()
+
+# (start, end) -> (detector, its version, when, result); only closed
+# windows. A streaming detector changes with every sample, so its results
+# are reused for up to _RANGE_CACHE_TTL seconds rather than only while the
+# version is unchanged.
+_range_cache = OrderedDict()
+_RANGE_CACHE_SIZE = 64
+_RANGE_CACHE_TTL = 30.0
+
+
+def _forward_fill(name, ts):
+    out = np.full(len(ts), np.nan)
+    if not len(ts):
+        return out
+
+    series = np.array(
+        storage.metric_series(name, ts[0] - EXTRA_LOOKBACK, ts[-1] + 0.001), dtype=float
+    ).reshape(-1, 2)
+
+    # Extras written with a sample share its ms timestamp
+    idx = np.searchsorted(series[:, 0], np.round(ts * 1000), side="right") - 1
+    ok = idx >= 0
+    out[ok] = series[idx[ok], 1]
+    return out
+
+
+def _features(rows):
+    # rows are (epoch seconds, *METRICS, interval) in time order; rows
+    # missing any feature are dropped
+    data = np.array(rows, dtype=float).reshape(-1, len(METRICS) + 2)
+    ts = data[:, 0]
+
+    columns = [
+        data[:, 1 + METRICS.index(f)] if f in METRICS else _forward_fill(f, ts)
+        for f in FEATURES
+    ]
+    X = np.column_stack(columns) if columns else np.empty((len(ts), 0))
+    keep = ~np.isnan(X).any(axis=1)
+    return ts[keep], X[keep]
+
+
+def load_window(limit=WINDOW):
+    # The ring buffer holds the core metrics of the latest samples, so a
+    # window that fits in it never touches SQLite
+    if len(ring) >= limit and set(FEATURES) <= set(METRICS):
+        records = ring.window(limit)
+        rows = np.column_stack([records["ts"]] + [records[c] for c in archive.COLUMNS])
+    else:
+        rows = storage.raw_latest(limit)
+    ts, X = _features(rows)
+
+    window = None
+    if len(ts):
+        window = {"rows": len(ts), "from": format_timestamp(ts[0]), "to": format_timestamp(ts[-1])}
+    return X, window
 
-model = None
 
 def train_model():
-    global model
-    conn = sqlite3.connect("autosense.db")
-    df = pd.read_sql("SELECT cpu, ram, disk FROM system_stats ORDER BY id DESC LIMIT 1000", conn)
+    global detector, model_info
+    X, window = load_window()
 
-    if len(df) < 30:
+    if len(X) < MIN_SAMPLES:
         return None
 
-    model = IsolationForest(contamination=0.1)
-    model.fit(df)
-    return model
+    # Fit a fresh instance off to the side, then swap it in atomically
+    detector = DETECTORS[_kind]().fit(X)
+    model_info = {"source": "trained", "trained_at": time.time(), "window": window}
+    return detector
+
+
+def save_model(path=MODEL_PATH):
+    artifact = dict(model_info, schema=MODEL_SCHEMA, kind=_kind, metrics=FEATURES,
+                    saved_at=time.time(), detector=detector)
+
+    # Write next to the target and rename so a crash never leaves half a file
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_model(path=MODEL_PATH):
+    global detector, model_info
+    try:
+        with open(path, "rb") as f:
+            artifact = pickle.load(f)
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        print(f"Ignoring unreadable model artifact {path}: {e}")
+        return False
+
+    if (artifact.get("schema"), artifact.get("kind"), tuple(artifact.get("metrics", ()))) \
+            != (MODEL_SCHEMA, _kind, FEATURES):
+        print(f"Ignoring model artifact {path}: built for a different detector or schema")
+        return False
+
+    detector = artifact.pop("detector")
+    model_info = dict(artifact, source="disk")
+    return True
+
+
+_model_mtime = None
+
+
+def reload_model(path=MODEL_PATH):
+    # For processes that don't train (API workers): load the artifact
+    # again whenever the trainer has saved a new one
+    global _model_mtime
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    if mtime == _model_mtime:
+        return False
+    _model_mtime = mtime
+    return load_model(path)
+
+
+def _has_state():
+    return model_info["source"] != "untrained" or not detector.needs_fit()
+
 
-def detect_anomaly(cpu, ram, disk):
-    global model
-    if model is None:
-        train_model()
+def _train_loop():
+    # Streaming detectors only need seeding; windowed ones keep refitting.
+    # Either way the current state is persisted for the next start.
+    while True:
+        try:
+            with selfmon.track("trainer"):
+                if detector.needs_fit():
+                    train_model()
+                if _has_state():
+                    save_model()
+        except Exception as e:
+            print(f"Anomaly model training failed: {e}")
+        if _stop.wait(REFIT_INTERVAL):
+            return
+
+
+def start_trainer():
+    global _trainer
+    if _trainer is None:
+        load_model()
+        _trainer = threading.Thread(target=_train_loop, name="anomaly-trainer", daemon=True)
+        _trainer.start()
+
+
+def stop_trainer():
+    _stop.set()
+    if _trainer is not None and _has_state():
+        try:
+            save_model()
+        except OSError as e:
+            print(f"Could not save anomaly model: {e}")
+
+
+def observe(stats):
+    # Called by the collector for every sample: score first, then learn
+    x = [stats.get(f) for f in FEATURES]
+    if None in x:
+        # An extra feature's collector hasn't reported yet
         return 0
+    model = detector
+    flag = model.predict(x)
+    model.update(x)
+    return flag
+
+
+def detect_anomaly(cpu, ram, disk, **extra):
+    values = dict(extra, cpu=cpu, ram=ram, disk=disk)
+    return detector.predict([values[f] for f in FEATURES])
+
+
+def load_range(start, end):
+    data = archive.raw_arrays(start, end)
+    return _features(np.column_stack([data["ts"]] + [data[c] for c in archive.COLUMNS]))
+
+
+def detect_range(start, end):
+    model = detector
+    key = (int(start), int(end))
+
+    version, now = model.version, time.monotonic()
+    cached = _range_cache.get(key)
+    if cached is not None and cached[0] is model \
+            and (cached[1] == version or now - cached[2] < _RANGE_CACHE_TTL):
+        _range_cache.move_to_end(key)
+        return cached[3]
+
+    ts, X = load_range(start, end)
+    flags = model.predict_batch(X)
+    hits = np.flatnonzero(flags)
+
+    result = {
+        "from": start,
+        "to": end,
+        "count": len(X),
+        "anomalies": len(hits),
+        "points": [
+            dict(t=int(ts[i]), **{f: float(X[i, j]) for j, f in enumerate(FEATURES)})
+            for i in hits
+        ],
+    }
+
+    # Windows still open at the live edge keep changing, so don't cache them
+    if end < time.time() - 60:
+        _range_cache[key] = (model, version, now, result)
+        if len(_range_cache) > _RANGE_CACHE_SIZE:
+            _range_cache.popitem(last=False)
 
-    prediction = model.predict([[cpu, ram, disk]])[0]
-    return 1 if prediction == -1 else 0
+    return result
@@ -0,0 +1,143 @@
+import os, time, zlib
+import numpy as np
+import storage
+from storage import RAW_TABLE, SCALE
+
+# Raw samples older than ARCHIVE_AGE are sealed into one compressed block
+# per column per hour and removed from the raw table. 0 disables archiving.
+ARCHIVE_AGE = float(os.environ.get("AUTOSENSE_ARCHIVE_AGE", 6 * 3600))
+ARCHIVE_RETENTION = float(os.environ.get("AUTOSENSE_ARCHIVE_RETENTION", 30 * 24 * 3600))
+ENABLED = ARCHIVE_AGE > 0
+
+COLUMNS = ("cpu", "ram", "disk", "interval")
+
+
+# Timestamps (epoch ms) are stored as delta-of-delta, values (fixed-point
+# integers) as deltas. Regular sampling turns both into long runs of zeros
+# and small numbers, which zlib compresses well.
+
+def encode_ts(ts):
+    ts = np.asarray(ts, dtype="<i8")
+    head = ts[:1]
+    deltas = np.diff(ts)
+    return zlib.compress(np.concatenate([head, deltas[:1], np.diff(deltas)]).astype("<i8").tobytes())
+
+
+def decode_ts(blob):
+    data = np.frombuffer(zlib.decompress(blob), dtype="<i8")
+    if len(data) < 2:
+        return data.copy()
+    deltas = np.cumsum(data[1:])
+    return np.concatenate([data[:1], data[0] + np.cumsum(deltas)])
+
+
+def encode_values(values):
+    values = np.asarray(values, dtype="<i4")
+    return zlib.compress(np.concatenate([values[:1], np.diff(values)]).astype("<i4").tobytes())
+
+
+def decode_values(blob):
+    return np.cumsum(np.frombuffer(zlib.decompress(blob), dtype="<i4"), dtype=np.int64)
+
+
+def _scaled(name, values):
+    # Back from fixed-point to percent / seconds; a missing interval is -1
+    if name == "interval":
+        out = values / 1000.0
+        out[values < 0] = np.nan
+        return out
+    return values / SCALE
+
+
+class Archive:
+    def __init__(self, age=ARCHIVE_AGE, retention=ARCHIVE_RETENTION):
+        self.age = age
+        self.retention = retention
+
+    def seal(self, conn, now=None, until=None):
+        # Seals the oldest sealable hour per call, inside the caller's write
+        # transaction; hours ending after `until` (epoch seconds) are left
+        # alone. Returns the number of raw rows archived.
+        now = time.time() if now is None else now
+        limit = now - self.age if until is None else min(now - self.age, until)
+        first = conn.execute(f"SELECT MIN(ts) FROM {RAW_TABLE}").fetchone()[0]
+        if first is not None:
+            hour = first // 3600000 * 3600
+            if hour + 3600 <= limit:
+                return self._seal_hour(conn, hour)
+
+        conn.execute("DELETE FROM archive_blocks WHERE hour < ?", (int(now - self.retention),))
+        return 0
+
+    def _seal_hour(self, conn, hour):
+        span = (hour * 1000, (hour + 3600) * 1000)
+        rows = conn.execute(
+            f"SELECT ts, cpu, ram, disk, COALESCE(interval, -1) FROM {RAW_TABLE} "
+            "WHERE ts >= ? AND ts < ? ORDER BY ts",
+            span
+        ).fetchall()
+        data = np.array(rows, dtype=np.int64).reshape(-1, len(COLUMNS) + 1)
+
+        # Rows that show up for an hour that is already sealed are merged in
+        existing = _decode_hour(conn.execute(
+            "SELECT metric, data FROM archive_blocks WHERE hour = ?", (hour,)
+        ).fetchall())
+        if existing is not None:
+            data = np.concatenate([existing, data])
+            _, keep = np.unique(data[:, 0], return_index=True)
+            data = data[keep]
+
+        blocks = [(hour, "ts", len(data), encode_ts(data[:, 0]))]
+        blocks += [(hour, name, len(data), encode_values(data[:, 1 + i])) for i, name in enumerate(COLUMNS)]
+        conn.executemany("INSERT OR REPLACE INTO archive_blocks (hour, metric, count, data) VALUES (?,?,?,?)",
+                         blocks)
+        conn.execute(f"DELETE FROM {RAW_TABLE} WHERE ts >= ? AND ts < ?", span)
+        return len(rows)
+
+
+def _decode_hour(blocks):
+    # Raw layout (ts ms, fixed-point columns) of one sealed hour
+    blocks = dict(blocks)
+    if "ts" not in blocks:
+        return None
+    return np.column_stack([decode_ts(blocks["ts"])] + [decode_values(blocks[c]) for c in COLUMNS])
+
+
+def read(start, end, columns=COLUMNS):
+    # {"ts": seconds, column: values} from the blocks overlapping
+    # [start, end); only the requested columns are decompressed
+    names = ("ts",) + tuple(columns)
+    rows = storage.query(
+        f"SELECT hour, metric, data FROM archive_blocks WHERE hour > ? AND hour < ? "
+        f"AND metric IN ({','.join('?' * len(names))}) ORDER BY hour",
+        (int(start) - 3600, end) + names
+    )
+
+    parts = {name: [] for name in names}
+    for hour, name, blob in rows:
+        parts[name].append(decode_ts(blob) if name == "ts" else decode_values(blob))
+
+    result = {"ts": np.concatenate(parts["ts"]) / 1000.0 if parts["ts"] else np.empty(0)}
+    for name in columns:
+        values = np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=np.int64)
+        result[name] = _scaled(name, values)
+
+    keep = (result["ts"] >= start) & (result["ts"] < end)
+    return {name: values[keep] for name, values in result.items()}
+
+
+def overlaps(start, end):
+    return bool(storage.query(
+        "SELECT 1 FROM archive_blocks WHERE hour > ? AND hour < ? LIMIT 1", (int(start) - 3600, end)
+    ))
+
+
+def raw_arrays(start, end, columns=COLUMNS):
+    # Archived and live raw samples in [start, end) as NumPy columns
+    archived = read(start, end, columns)
+    live = np.array(storage.raw_range(start, end), dtype=float).reshape(-1, len(COLUMNS) + 1)
+
+    result = {"ts": np.concatenate([archived["ts"], live[:, 0]])}
+    for name in columns:
+        result[name] = np.concatenate([archived[name], live[:, 1 + COLUMNS.index(name)]])
+    return result
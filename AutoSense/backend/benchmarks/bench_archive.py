@@ -0,0 +1,66 @@
+# Sealed archive blocks vs raw rows: bytes per sample, sealing and decode
+# speed, and /history output that must match before and after sealing.
+#
+#   python benchmarks/bench_archive.py [hours]
+
+import os, random, sys, tempfile, time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ["AUTOSENSE_DB"] = os.path.join(tempfile.mkdtemp(prefix="autosense-bench-"), "autosense.db")
+
+import database
+import storage
+import archive
+from history import get_history
+
+
+def table_bytes(name):
+    return storage.query("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (name,))[0][0] or 0
+
+
+if __name__ == "__main__":
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    database.init_db()
+
+    # 1 Hz with a little jitter and occasional adaptive-rate bursts
+    start = (time.time() - (hours + 7) * 3600) // 3600 * 3600
+    rows, ts, cpu = [], start, 20.0
+    while ts < start + hours * 3600:
+        interval = 0.1 if random.random() < 0.01 else 1.0
+        cpu = min(100.0, max(0.0, cpu + random.gauss(0, 2)))
+        rows.append(storage.raw_row({"cpu": round(cpu, 1), "ram": round(random.uniform(40, 42), 1),
+                                     "disk": 71.2, "interval": interval}, ts + random.uniform(0, 0.003)))
+        ts += interval
+    with storage.write() as conn:
+        conn.executemany(f"INSERT OR REPLACE INTO {storage.RAW_TABLE} VALUES (?,?,?,?,?)", rows)
+    n = storage.query(f"SELECT COUNT(*) FROM {storage.RAW_TABLE}")[0][0]
+
+    window = (start + 3600 + 17, start + 3 * 3600 - 5)
+    before = get_history(*window, step=30)
+    raw = table_bytes(storage.RAW_TABLE)
+
+    began = time.perf_counter()
+    sealer = archive.Archive()
+    while True:
+        with storage.write() as conn:
+            if not sealer.seal(conn):
+                break
+    sealed = time.perf_counter() - began
+
+    assert storage.query(f"SELECT COUNT(*) FROM {storage.RAW_TABLE}")[0][0] == 0
+    blocks = storage.query("SELECT SUM(LENGTH(data)) FROM archive_blocks")[0][0]
+    print(f"raw rows      {raw / n:6.1f} bytes/sample ({n} samples)")
+    print(f"archive blobs {blocks / n:6.1f} bytes/sample, {raw / blocks:.1f}x smaller")
+    print(f"sealed {hours}h in {sealed:.2f}s")
+
+    began = time.perf_counter()
+    data = archive.read(start, start + 3600, ("cpu",))
+    print(f"decode 1h cpu {(time.perf_counter() - began) * 1000:6.2f} ms ({len(data['ts'])} samples)")
+
+    after = get_history(*window, step=30)
+    assert before["t"] == after["t"], "bucket times differ"
+    for m in database.METRICS:
+        for k in ("avg", "min", "max"):
+            assert before[m][k] == after[m][k], (m, k)
+    print(f"history over sealed hours matches ({len(after['t'])} buckets)")
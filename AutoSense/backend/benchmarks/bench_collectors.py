@@ -0,0 +1,47 @@
+# Collector backends: samples/sec at full speed and the agent's own CPU%
+# while sampling at a fixed rate, for psutil vs the Linux /proc fast path.
+#
+#   python benchmarks/bench_collectors.py [seconds] [hz]
+
+import os, sys, time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from collectors import make_backend
+
+
+def throughput(fn, seconds):
+    n = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        fn()
+        n += 1
+    return n / seconds
+
+
+def cpu_at_rate(fn, seconds, hz):
+    period = 1.0 / hz
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    next_at = wall0
+    while time.perf_counter() - wall0 < seconds:
+        fn()
+        next_at += period
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return (time.process_time() - cpu0) / (time.perf_counter() - wall0) * 100
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    hz = float(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    kinds = ["psutil"] + (["procfs"] if sys.platform.startswith("linux") else [])
+    for kind in kinds:
+        backend = make_backend(kind)
+        sps = throughput(backend.sample, seconds)
+        cpu = cpu_at_rate(backend.sample, seconds, hz)
+        pps = throughput(backend.process_rows, seconds)
+        print(f"{kind:7} {sps:10.0f} samples/s  {cpu:6.2f}% CPU at {hz:.0f} Hz  "
+              f"{pps:8.1f} process tables/s ({len(backend.process_rows())} procs)")
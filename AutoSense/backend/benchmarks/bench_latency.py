@@ -0,0 +1,45 @@
+# Cost of one histogram observation, single-threaded and from several
+# threads at once; the totals must add up exactly.
+#
+#   python benchmarks/bench_latency.py [observations] [threads]
+
+import os, sys, threading, time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from latency import Histogram
+
+
+def run(hist, n):
+    observe = hist.observe
+    for i in range(n):
+        observe((i % 1000) * 1e-5)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    hist = Histogram()
+    start = time.perf_counter()
+    run(hist, n)
+    elapsed = time.perf_counter() - start
+    print(f"observe: {elapsed / n * 1e9:.0f} ns/op")
+
+    start = time.perf_counter()
+    t = start
+    for _ in range(n):
+        t = hist.since(t)
+    elapsed = time.perf_counter() - start
+    print(f"since:   {elapsed / n * 1e9:.0f} ns/op")
+
+    hist = Histogram()
+    workers = [threading.Thread(target=run, args=(hist, n // threads)) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    snap = hist.snapshot()
+    assert snap["count"] == n // threads * threads, snap["count"]
+    print(f"{threads} threads: {snap['count']} observations, none lost")
@@ -0,0 +1,66 @@
+# Ring buffer: append rate, latest-window reads vs SQLite, a reader in a
+# second process, and the contents surviving a reopen.
+#
+#   python benchmarks/bench_ring.py [samples]
+
+import os, subprocess, sys, tempfile, time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+TMP = tempfile.mkdtemp(prefix="autosense-bench-")
+os.environ["AUTOSENSE_DB"] = os.path.join(TMP, "autosense.db")
+os.environ["AUTOSENSE_RING_PATH"] = os.path.join(TMP, "autosense.ring")
+os.environ["AUTOSENSE_RING_SIZE"] = "3600"
+
+import numpy as np
+import database
+import storage
+from ring import RingBuffer, RING_PATH, RING_SIZE, ring
+
+# Runs in a second process that maps the same file through ring.ring
+READER = """
+import sys; sys.path.insert(0, %r)
+from ring import ring
+print(len(ring), ring.window(1)["ts"][0])
+"""
+
+
+def timed(fn, runs=50):
+    began = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - began) / runs * 1000, result
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    capacity = RING_SIZE
+    database.init_db()
+
+    start = time.time() - n
+    samples = [{"ts": start + i, "cpu": 12.5, "ram": 40.1, "disk": 71.2, "interval": 1.0} for i in range(n)]
+    began = time.perf_counter()
+    for stats in samples:
+        ring.append(stats)
+    elapsed = time.perf_counter() - began
+    print(f"append       {n / elapsed:10.0f} samples/s")
+
+    with storage.write() as conn:
+        conn.executemany(f"INSERT INTO {storage.RAW_TABLE} VALUES (?,?,?,?,?)",
+                         [storage.raw_row(s, s["ts"]) for s in samples])
+
+    ms, window = timed(lambda: ring.window(1000))
+    print(f"ring window  {ms:10.3f} ms for 1000 samples (view: {window.base is not None})")
+    ms, _ = timed(lambda: storage.raw_latest(1000))
+    print(f"sqlite       {ms:10.3f} ms for 1000 samples")
+
+    out = subprocess.run([sys.executable, "-c", READER % BACKEND],
+                         capture_output=True, text=True, check=True).stdout.split()
+    assert int(out[0]) == capacity and float(out[1]) == samples[-1]["ts"], out
+    print(f"second process sees {out[0]} records, latest ts matches")
+
+    ring.flush()
+    reopened = RingBuffer(RING_PATH, capacity)
+    assert np.array_equal(reopened.window(capacity), ring.window(capacity))
+    assert reopened.window(capacity)["ts"][0] == samples[-capacity]["ts"]
+    print("reopened ring holds the same last", capacity, "records")
@@ -0,0 +1,59 @@
+# Scheduler accuracy on a simulated clock: 10,000 ticks with random job
+# durations and oversleep must land exactly on their aligned deadlines.
+#
+#   python benchmarks/bench_scheduler.py [ticks] [interval]
+
+import os, random, sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from scheduler import Scheduler
+
+
+class FakeClock:
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def wait(self, delay):
+        # Oversleep by up to 3 ms like a loaded host would
+        self.now += delay + random.uniform(0, 0.003)
+        return False
+
+
+if __name__ == "__main__":
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+
+    random.seed(1)
+    clock = FakeClock(1_700_000_000.123)
+    sched = Scheduler(clock=clock, wait=clock.wait)
+    fired = []
+
+    def job():
+        fired.append(clock.now)
+        # Occasionally take longer than a whole interval to force missed ticks
+        clock.now += interval * 2.5 if random.random() < 0.001 else random.uniform(0, interval / 4)
+        if len(fired) >= ticks:
+            sched.stop()
+
+    info = sched.add("sim", interval, job)
+    first = info["anchor"]
+    sched.run()
+
+    s = sched.stats()[0]
+    expected = first + (s["ticks"] + s["missed"]) * interval
+    drift = info["next"] - expected
+    elapsed_ticks = round((fired[-1] - first) / interval)
+
+    print(f"ticks={s['ticks']} missed={s['missed']} interval={interval}s")
+    print(f"lateness mean={s['mean_lateness_ms']} ms max={s['max_lateness_ms']} ms")
+    print(f"cumulative drift after {elapsed_ticks} periods: {drift * 1000:.6f} ms")
+
+    assert abs(drift) < 1e-6, "deadlines drifted"
+    assert s["max_lateness_ms"] < 5, "a tick fired more than a few ms late"
+    assert all(abs(t - first - round((t - first) / interval) * interval) < 0.005 for t in fired)
+    print("OK")
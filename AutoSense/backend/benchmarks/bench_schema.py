@@ -0,0 +1,85 @@
+# Legacy text-timestamp system_stats vs the integer-ms WITHOUT ROWID raw
+# table: file size per row and one-hour range scan time. The new table is
+# filled by the same online migration a legacy database goes through.
+#
+#   python benchmarks/bench_schema.py [rows]
+
+import os, random, sys, tempfile, time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ["AUTOSENSE_DB"] = os.path.join(tempfile.mkdtemp(prefix="autosense-bench-"), "autosense.db")
+
+import sqlite3
+import database
+import storage
+
+
+def legacy_db(rows, start):
+    conn = sqlite3.connect(storage.DB_PATH)
+    conn.execute("""
+        CREATE TABLE system_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cpu REAL, ram REAL, disk REAL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            interval REAL
+        )
+    """)
+    conn.execute("CREATE INDEX idx_system_stats_timestamp ON system_stats(timestamp)")
+    conn.executemany(
+        "INSERT INTO system_stats (cpu, ram, disk, timestamp, interval) VALUES (?,?,?,?,?)",
+        ((round(random.uniform(0, 100), 1), round(random.uniform(30, 60), 1), 71.2,
+          storage.format_timestamp(start + i), 1.0) for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def size():
+    conn = sqlite3.connect(storage.DB_PATH)
+    conn.execute("VACUUM")
+    # In WAL mode VACUUM lands in the WAL until it is checkpointed
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return os.path.getsize(storage.DB_PATH)
+
+
+def legacy_range(start, end):
+    # The query raw_range ran before the raw table existed
+    return storage.query(
+        "SELECT CAST(strftime('%s', timestamp) AS INTEGER), cpu, ram, disk, interval "
+        "FROM system_stats WHERE timestamp >= ? AND timestamp < ? ORDER BY id",
+        (storage.format_timestamp(start), storage.format_timestamp(end))
+    )
+
+
+def scan(query, start, runs=20):
+    began = time.perf_counter()
+    for i in range(runs):
+        rows = query(start + i * 60, start + i * 60 + 3600)
+    return (time.perf_counter() - began) / runs * 1000, len(rows)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 86400
+    start = time.time() - n
+
+    legacy_db(n, start)
+    old = size()
+    print(f"legacy   {old / n:6.1f} bytes/row   1h scan {scan(legacy_range, start)[0]:7.2f} ms")
+    database.init_db()
+    assert storage.has_legacy()
+
+    began = time.perf_counter()
+    while storage.has_legacy():
+        with storage.write() as conn:
+            database.migrate_legacy(conn)
+    migrated = time.perf_counter() - began
+
+    count = storage.query(f"SELECT COUNT(*) FROM {storage.RAW_TABLE}")[0][0]
+    assert count == n, count
+    storage.close()
+    new = size()
+    ms, rows = scan(storage.raw_range, start)
+    print(f"raw      {new / n:6.1f} bytes/row   1h scan {ms:7.2f} ms   ({rows} rows)")
+    print(f"migrated {n} rows in {migrated:.2f}s, {old / new:.1f}x smaller")
@@ -0,0 +1,56 @@
+# Seqlock shared state: a publisher process rewrites the snapshot as fast
+# as it can while this process reads it; every read must be a complete,
+# consistent payload.
+#
+#   python benchmarks/bench_shm.py [seconds]
+
+import os, multiprocessing, sys, time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from shm import SharedState, Unavailable
+
+NAME = f"autosense_bench_{os.getpid()}"
+
+
+def publisher(seconds):
+    shared = SharedState(NAME, create=True)
+    deadline = time.monotonic() + seconds
+    seq = 0
+    while time.monotonic() < deadline:
+        seq += 1
+        # Variable size so a torn read would show up as broken JSON or a mismatch
+        shared.publish({"stats": {"seq": seq, "check": seq * 7}, "pad": "x" * (seq % 4096)})
+    shared.close()
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    SharedState(NAME, create=True).close()
+    proc = multiprocessing.Process(target=publisher, args=(seconds,))
+    proc.start()
+
+    reader = SharedState(NAME)
+    reads = distinct = 0
+    last = None
+    began = time.perf_counter()
+    while proc.is_alive():
+        try:
+            state = reader.read()
+        except Unavailable:
+            continue
+        stats = state["stats"]
+        assert stats["check"] == stats["seq"] * 7 and len(state["pad"]) == stats["seq"] % 4096
+        reads += 1
+        if stats["seq"] != last:
+            distinct += 1
+            last = stats["seq"]
+    elapsed = time.perf_counter() - began
+
+    reader.close()
+    from multiprocessing import shared_memory
+    segment = shared_memory.SharedMemory(NAME)
+    segment.close()
+    segment.unlink()
+    print(f"{reads / elapsed:10.0f} reads/s, {distinct} distinct snapshots, latest seq {last}, none torn")
@@ -0,0 +1,71 @@
+# Requests/sec on /stats: legacy blocking sampler vs shared background snapshot.
+#
+#   python benchmarks/bench_stats.py [seconds] [clients]
+#
+# Needs httpx for FastAPI's TestClient.
+
+import os, sys, tempfile, threading, time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ["AUTOSENSE_DB"] = os.path.join(tempfile.mkdtemp(prefix="autosense-bench-"), "autosense.db")
+
+import psutil
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import monitor
+
+
+def legacy_get_stats():
+    return {
+        "cpu": psutil.cpu_percent(interval=1),
+        "ram": psutil.virtual_memory().percent,
+        "disk": psutil.disk_usage("/").percent
+    }
+
+
+app = FastAPI()
+
+
+@app.get("/stats-legacy")
+def stats_legacy():
+    return legacy_get_stats()
+
+
+@app.get("/stats")
+def stats():
+    return monitor.get_stats()
+
+
+def run(path, seconds, clients):
+    done = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def worker(i):
+        with TestClient(app) as client:
+            while time.perf_counter() < deadline:
+                client.get(path)
+                done[i] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(done) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    threading.Thread(target=monitor.log_stats, daemon=True).start()
+
+    before = run("/stats-legacy", seconds, clients)
+    after = run("/stats", seconds, clients)
+
+    print(f"/stats legacy (cpu_percent(interval=1)): {before:10.1f} req/s")
+    print(f"/stats shared snapshot:                  {after:10.1f} req/s")
+    print(f"speedup: {after / before:.0f}x")
@@ -0,0 +1,89 @@
+# Sustained system_stats inserts/sec: connect/insert/commit/close per sample
+# vs the batched StatsWriter.
+#
+#   python benchmarks/bench_writer.py [seconds]
+#
+# When strace is on PATH each mode is re-run under `strace -c` to count the
+# fsync/fdatasync calls; otherwise only commits per minute are reported.
+
+import os, shutil, subprocess, sys, tempfile, time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ["AUTOSENSE_DB"] = os.path.join(tempfile.mkdtemp(prefix="autosense-bench-"), "autosense.db")
+
+import sqlite3
+import database
+import storage
+
+STATS = {"cpu": 12.5, "ram": 48.0, "disk": 71.2}
+START = time.time()
+
+
+def sample(n):
+    # Raw rows are keyed by ms, so every sample needs its own timestamp
+    return dict(STATS, ts=START + n / 1000)
+
+
+def legacy(seconds):
+    n = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        conn = sqlite3.connect(storage.DB_PATH)
+        stats = sample(n)
+        conn.execute(f"INSERT INTO {storage.RAW_TABLE} (ts, cpu, ram, disk, interval) VALUES (?,?,?,?,?)",
+                     storage.raw_row(stats, stats["ts"]))
+        conn.commit()
+        conn.close()
+        n += 1
+    return n, n
+
+
+def batched(seconds):
+    writer = database.StatsWriter(batch_size=500, flush_interval=1.0).start()
+    n = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        writer.add(sample(n))
+        n += 1
+        if n % 500 == 0:
+            # Let the writer keep up instead of measuring list.append
+            while writer.written < n - 500:
+                time.sleep(0.001)
+    writer.close()
+    return writer.written, writer.flushes
+
+
+def run(mode, seconds):
+    database.init_db()
+    start = time.perf_counter()
+    rows, commits = (legacy if mode == "legacy" else batched)(seconds)
+    elapsed = time.perf_counter() - start
+    print(f"{mode:8} {rows / elapsed:12.0f} inserts/s {commits / elapsed * 60:12.0f} commits/min")
+    return elapsed
+
+
+def count_fsyncs(mode, seconds):
+    out = tempfile.mktemp()
+    subprocess.run(["strace", "-f", "-c", "-o", out, "-e", "trace=fsync,fdatasync",
+                    sys.executable, __file__, seconds, mode], stdout=subprocess.DEVNULL, check=True)
+    calls = 0
+    with open(out) as f:
+        for line in f:
+            parts = line.split()
+            if parts and parts[-1] in ("fsync", "fdatasync"):
+                calls += int(parts[3])
+    print(f"{mode:8} {calls / float(seconds) * 60:12.0f} fsyncs/min")
+
+
+if __name__ == "__main__":
+    seconds = sys.argv[1] if len(sys.argv) > 1 else "3"
+
+    if len(sys.argv) > 2:
+        run(sys.argv[2], float(seconds))
+    else:
+        for mode in ("legacy", "batched"):
+            run(mode, float(seconds))
+        if shutil.which("strace"):
+            for mode in ("legacy", "batched"):
+                count_fsyncs(mode, seconds)
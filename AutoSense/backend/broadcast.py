@@ -0,0 +1,52 @@
+import asyncio, json, threading
+
+
+class Broadcaster:
+    """Fans each collector snapshot out to every /stream client.
+
+    The snapshot is serialized once in the collector thread and handed to
+    each client's event loop. Every client has a small queue; when a slow
+    client falls behind, the oldest pending message is dropped so it
+    always catches up to the latest state instead of buffering forever.
+    """
+
+    def __init__(self, queue_size=4):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.last = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        entry = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers.add(entry)
+        return entry
+
+    def unsubscribe(self, entry):
+        with self._lock:
+            self._subscribers.discard(entry)
+
+    @property
+    def clients(self):
+        return len(self._subscribers)
+
+    def publish(self, message):
+        data = f"data: {json.dumps(message)}\n\n"
+        self.last = data
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, data)
+            except RuntimeError:
+                # Loop already closed; the stream's finally will unsubscribe
+                pass
+
+    def _offer(self, queue, data):
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(data)
@@ -0,0 +1,167 @@
+import math, os, sys, time
+import psutil
+from database import METRICS
+
+
+class PsutilBackend:
+    """Portable collector backed by psutil."""
+
+    name = "psutil"
+
+    def __init__(self, disk_path="/"):
+        self.disk_path = disk_path
+        # Prime the CPU counters so the first non-blocking read is meaningful
+        psutil.cpu_percent(interval=None)
+
+    def sample(self):
+        return {
+            "cpu": psutil.cpu_percent(interval=None),
+            "ram": psutil.virtual_memory().percent,
+            "disk": psutil.disk_usage(self.disk_path).percent
+        }
+
+    def process_rows(self):
+        rows = []
+        for p in psutil.process_iter(["pid", "name", "create_time", "cpu_times", "memory_info"]):
+            info = p.info
+            times, mem = info["cpu_times"], info["memory_info"]
+            if times is None or mem is None:
+                continue
+            rows.append((info["pid"], info["name"], info["create_time"],
+                         times.user + times.system, mem.rss))
+        return rows
+
+
+def make_backend(kind=None):
+    kind = kind or os.environ.get("AUTOSENSE_COLLECTOR", "psutil")
+
+    if kind == "procfs":
+        if sys.platform.startswith("linux"):
+            from procfs import ProcfsBackend
+            return ProcfsBackend()
+        print("AUTOSENSE_COLLECTOR=procfs needs Linux; using psutil")
+    elif kind != "psutil":
+        raise ValueError(f"Unknown AUTOSENSE_COLLECTOR {kind!r}, expected psutil or procfs")
+
+    return PsutilBackend()
+
+
+backend = make_backend()
+
+
+# Collector registry. Each collector declares the metrics it produces and
+# how often it runs (0 = every scheduler tick); the sampling loop batches
+# everything due on a tick into one snapshot.
+COLLECTORS = {}
+
+# Due checks tolerate a tick arriving this early relative to a boundary
+_SLACK = 0.05
+
+
+def register(name, interval, metrics, optional=False):
+    def wrap(fn):
+        COLLECTORS[name] = {
+            "name": name,
+            "interval": interval,
+            "metrics": tuple(metrics),
+            "optional": optional,
+            "fn": fn,
+            "next": 0.0,
+            "runs": 0,
+            "errors": 0,
+        }
+        return fn
+    return wrap
+
+
+def all_metrics():
+    return [m for c in COLLECTORS.values() for m in c["metrics"]]
+
+
+def collect_due(now, skip_optional=False):
+    values = {}
+    for c in COLLECTORS.values():
+        if c["optional"] and skip_optional:
+            continue
+        if now + _SLACK < c["next"]:
+            continue
+
+        interval = c["interval"]
+        if interval:
+            c["next"] = (math.floor((now + _SLACK) / interval) + 1) * interval
+
+        try:
+            values.update(c["fn"]())
+            c["runs"] += 1
+        except Exception as e:
+            c["errors"] += 1
+            print(f"Collector {c['name']} failed: {e}")
+    return values
+
+
+class _Rates:
+    # Turns monotonically increasing counters into per-second rates
+    def __init__(self):
+        self.last = None
+
+    def update(self, counters):
+        now = time.monotonic()
+        last, self.last = self.last, (now, counters)
+        if last is None or now <= last[0]:
+            return {}
+        elapsed = now - last[0]
+        return {k: max(v - last[1][k], 0) / elapsed for k, v in counters.items()}
+
+
+@register("system", 0, METRICS)
+def _system():
+    return backend.sample()
+
+
+@register("cpu_cores", 5, [f"cpu{i}" for i in range(psutil.cpu_count() or 1)], optional=True)
+def _cpu_cores():
+    return {f"cpu{i}": v for i, v in enumerate(psutil.cpu_percent(interval=None, percpu=True))}
+
+
+_net = _Rates()
+
+
+@register("net", 5, ["net_rx_bytes_s", "net_tx_bytes_s", "net_rx_packets_s", "net_tx_packets_s"],
+          optional=True)
+def _net_io():
+    c = psutil.net_io_counters()
+    return _net.update({
+        "net_rx_bytes_s": c.bytes_recv,
+        "net_tx_bytes_s": c.bytes_sent,
+        "net_rx_packets_s": c.packets_recv,
+        "net_tx_packets_s": c.packets_sent,
+    })
+
+
+_disk = _Rates()
+
+
+@register("disk_io", 5, ["disk_read_iops", "disk_write_iops", "disk_read_bytes_s", "disk_write_bytes_s"],
+          optional=True)
+def _disk_io():
+    c = psutil.disk_io_counters()
+    if c is None:
+        # No block devices visible (e.g. some containers)
+        return {}
+    return _disk.update({
+        "disk_read_iops": c.read_count,
+        "disk_write_iops": c.write_count,
+        "disk_read_bytes_s": c.read_bytes,
+        "disk_write_bytes_s": c.write_bytes,
+    })
+
+
+@register("load", 10, ["load1", "load5", "load15"])
+def _load():
+    load1, load5, load15 = psutil.getloadavg()
+    return {"load1": load1, "load5": load5, "load15": load15}
+
+
+@register("swap", 30, ["swap"])
+def _swap():
+    return {"swap": psutil.swap_memory().percent}
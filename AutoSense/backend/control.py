@@ -1,34 +1,115 @@
-import sqlite3, psutil
+import fnmatch, re, threading, psutil
+import storage
+
+# Blacklist entries are plain process names, globs ("chrome*") or regexes
+# prefixed with "re:". They are cached in memory and reloaded whenever the
+# table is changed through this module, or its version in the meta table
+# shows another process (an API worker or the leader) changed it.
+_lock = threading.Lock()
+_cache = None
+
+
+def _alternation(patterns):
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+def _salvage(patterns):
+    # Rows stored before add_blacklist checked the combined matcher: keep
+    # every pattern that still combines, skip the rest
+    kept = []
+    for p in patterns:
+        try:
+            _alternation(kept + [p])
+            kept.append(p)
+        except re.error as e:
+            print(f"Ignoring blacklist pattern {p!r}: {e}")
+    return _alternation(kept) if kept else None
+
+
+def _compile(entries, version, strict=False):
+    names = set()
+    patterns = []
+
+    for entry in entries:
+        if entry.startswith("re:"):
+            patterns.append(entry[3:])
+        elif any(ch in entry for ch in "*?["):
+            patterns.append(fnmatch.translate(entry.lower()))
+        else:
+            names.add(entry.lower())
+
+    # One alternation means one regex call per process, however many patterns
+    matcher = None
+    if patterns:
+        try:
+            matcher = _alternation(patterns)
+        except re.error:
+            if strict:
+                raise
+            matcher = _salvage(patterns)
+
+    return {"apps": tuple(entries), "names": frozenset(names), "matcher": matcher, "version": version}
+
+
+def _load():
+    global _cache
+    # The version is read first so a change made while loading is seen next time
+    version = storage.blacklist_version()
+    cache = _compile(storage.blacklist_names(), version)
+    with _lock:
+        _cache = cache
+    return cache
+
+
+def refresh():
+    # The table is only read again once its version has changed
+    cache = _cache
+    if cache is None or cache["version"] != storage.blacklist_version():
+        cache = _load()
+    return cache
+
+
+def _blacklist():
+    cache = _cache
+    if cache is None:
+        cache = _load()
+    return cache
+
 
 def add_blacklist(app_name):
-    conn = sqlite3.connect("autosense.db")
-    c = conn.cursor()
+    # Fail before storing an entry that would break the combined matcher
+    # (inline flags not at the start, a duplicate group name, ...)
+    _compile(refresh()["apps"] + (app_name,), None, strict=True)
 
-    c.execute("""
-      CREATE TABLE IF NOT EXISTS blacklist (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE
-      )
-    """)
+    storage.insert_blacklist(app_name)
+    _load()
+
+
+def remove_blacklist(app_name):
+    removed = storage.delete_blacklist(app_name)
+    _load()
+    return removed
 
-    c.execute("INSERT OR IGNORE INTO blacklist(name) VALUES(?)", (app_name,))
-    conn.commit()
-    conn.close()
 
 def get_blacklist():
-    conn = sqlite3.connect("autosense.db")
-    c = conn.cursor()
-    c.execute("SELECT name FROM blacklist")
-    apps = [i[0] for i in c.fetchall()]
-    conn.close()
-    return {"apps": apps}
+    return {"apps": list(refresh()["apps"])}
 
-def kill_blacklisted():
-    bl = get_blacklist()["apps"]
 
+def is_blacklisted(name):
+    cache = _blacklist()
+    lname = name.lower()
+    if lname in cache["names"]:
+        return True
+    matcher = cache["matcher"]
+    return matcher is not None and matcher.fullmatch(lname) is not None
+
+
+def kill_blacklisted():
+    refresh()
     for proc in psutil.process_iter(["name"]):
         try:
-            if proc.info["name"] in bl:
+            name = proc.info["name"]
+            if name and is_blacklisted(name):
                 proc.kill()
-        except:
+        except psutil.Error:
             pass
@@ -1,18 +1,217 @@
-import sqlite3
+import os, sqlite3, threading, time
+import selfmon
+import storage
+from storage import RAW_TABLE
+
+METRICS = ("cpu", "ram", "disk")
+ROLLUP_TABLES = {60: "system_stats_1m", 3600: "system_stats_1h"}
+
+# Legacy system_stats rows moved into RAW_TABLE per writer flush
+MIGRATE_BATCH = int(os.environ.get("AUTOSENSE_MIGRATE_BATCH", 5000))
+
 
 def init_db():
-    conn = sqlite3.connect("autosense.db")
-    c = conn.cursor()
+    with storage.write() as conn:
+        _create(conn.cursor())
+
+
+def _create(c):
+    # Clustered on time, so range queries are primary key scans. Metrics
+    # are fixed-point integers (storage.SCALE), interval is in ms.
+    c.execute(f"""
+        CREATE TABLE IF NOT EXISTS {RAW_TABLE} (
+            ts INTEGER PRIMARY KEY,
+            cpu INTEGER,
+            ram INTEGER,
+            disk INTEGER,
+            interval INTEGER
+        ) WITHOUT ROWID
+    """)
+
+    # Databases from before RAW_TABLE keep their system_stats table until
+    # the writer has migrated it (see migrate_legacy)
+    if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'system_stats'").fetchone():
+        _add_column(c, "system_stats", "interval REAL")
+
+    # Narrow table for every metric beyond METRICS, so collectors can add
+    # metrics without schema changes. ts is epoch milliseconds.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS metric_samples (
+            ts INTEGER,
+            name TEXT,
+            value REAL,
+            PRIMARY KEY (ts, name)
+        ) WITHOUT ROWID
+    """)
 
     c.execute("""
-        CREATE TABLE IF NOT EXISTS system_stats (
+        CREATE TABLE IF NOT EXISTS blacklist (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cpu REAL,
-            ram REAL,
-            disk REAL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            name TEXT UNIQUE
         )
     """)
 
-    conn.commit()
-    conn.close()
+    # Progress markers that must survive restarts (see Rollup.rolled_up)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+    """)
+
+    # Sealed raw history: one compressed block per column per hour (see archive.py)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS archive_blocks (
+            hour INTEGER,
+            metric TEXT,
+            count INTEGER,
+            data BLOB,
+            PRIMARY KEY (hour, metric)
+        ) WITHOUT ROWID
+    """)
+
+    # Downsampled buckets keyed by the bucket start (epoch seconds)
+    aggregates = ", ".join(
+        f"{m}_min REAL, {m}_avg REAL, {m}_max REAL, {m}_p95 REAL" for m in METRICS
+    )
+    # seconds = time covered by the bucket's samples, used to weight them
+    for table in ROLLUP_TABLES.values():
+        c.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket INTEGER PRIMARY KEY,
+                samples INTEGER,
+                {aggregates},
+                seconds REAL
+            )
+        """)
+        _add_column(c, table, "seconds REAL")
+
+
+def _add_column(c, table, column):
+    # Upgrades databases created before the column existed
+    name = column.split()[0]
+    if name not in [r[1] for r in c.execute(f"PRAGMA table_info({table})")]:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+
+def migrate_legacy(conn, batch=MIGRATE_BATCH):
+    # Moves the oldest `batch` rows of the legacy table; drops it once empty
+    ids = "SELECT id FROM system_stats ORDER BY id LIMIT ?"
+    conn.execute(
+        f"INSERT OR IGNORE INTO {RAW_TABLE} (ts, cpu, ram, disk, interval) "
+        f"SELECT {storage.LEGACY_COLUMNS} FROM system_stats WHERE id IN ({ids})",
+        (batch,)
+    )
+    moved = conn.execute(f"DELETE FROM system_stats WHERE id IN ({ids})", (batch,)).rowcount
+
+    if moved < batch:
+        conn.execute("DROP TABLE system_stats")
+    return moved
+
+
+class StatsWriter:
+    """Buffers samples and writes them in batches through storage's writer.
+
+    A flush happens when `batch_size` samples are pending or `flush_interval`
+    seconds have passed since the last one, whichever comes first.
+    """
+
+    def __init__(self, batch_size=60, flush_interval=5.0, rollup=None, archive=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rollup = rollup
+        self.archive = archive
+
+        self._buffer = []
+        self._extra = []
+        self._buckets = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.written = 0
+        self.flushes = 0
+
+    def start(self):
+        if self._thread is None:
+            if self.rollup:
+                self._buckets.extend(self.rollup.resume())
+            self._thread = threading.Thread(target=self._run, name="stats-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def add(self, stats, extra=None):
+        ts = stats.get("ts", time.time())
+        row = storage.raw_row(stats, ts)
+        buckets = self.rollup.add(stats) if self.rollup else ()
+
+        ts_ms = int(ts * 1000)
+        extra_rows = [(ts_ms, name, value) for name, value in (extra or {}).items()]
+
+        with self._lock:
+            self._buffer.append(row)
+            self._extra.extend(extra_rows)
+            self._buckets.extend(buckets)
+            full = len(self._buffer) >= self.batch_size
+
+        if full:
+            self._wake.set()
+
+    def close(self, timeout=10):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            extra, self._extra = self._extra, []
+            buckets, self._buckets = self._buckets, []
+
+        if rows or extra or buckets:
+            with storage.write() as conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {RAW_TABLE} (ts, cpu, ram, disk, interval) VALUES (?,?,?,?,?)",
+                    rows
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO metric_samples (ts, name, value) VALUES (?,?,?)",
+                    extra
+                )
+                for table, bucket in buckets:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {table} VALUES ({','.join('?' * len(bucket))})",
+                        bucket
+                    )
+                if self.rollup:
+                    self.rollup.written(conn, buckets)
+
+            self.written += len(rows)
+            self.flushes += 1
+
+        legacy = storage.has_legacy()
+        if self.rollup or self.archive or legacy:
+            with storage.write() as conn:
+                if legacy:
+                    migrate_legacy(conn)
+                if self.archive:
+                    # Hours not yet rolled up stay in the raw table
+                    self.archive.seal(conn, until=self.rollup.rolled_up / 1000 if self.rollup else None)
+                if self.rollup:
+                    self.rollup.prune(conn)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                with selfmon.track("writer"):
+                    self._flush()
+            except sqlite3.Error as e:
+                print(f"StatsWriter flush failed: {e}")
+
+        # Drain whatever arrived before close()
+        self._flush()
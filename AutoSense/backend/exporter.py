@@ -0,0 +1,75 @@
+import gzip, re
+from database import METRICS
+import latency
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Snapshot keys that are bookkeeping rather than host metrics
+_SKIP = {"seq", "ts", "interval", "anomaly"}
+
+
+# Collector metric name suffix -> Prometheus unit suffix
+_UNITS = (
+    ("_bytes_s", "_bytes_per_second"),
+    ("_packets_s", "_packets_per_second"),
+    ("_iops", "_operations_per_second"),
+)
+_PERCENT = {"swap"}
+
+
+def _family(name):
+    # (metric name, help, labels) for one collector metric; every unit
+    # gets its own metric name and per-core CPU shares one family
+    core = re.fullmatch(r"cpu(\d+)", name)
+    if core:
+        return "autosense_cpu_core_percent", "Per-core CPU usage in percent.", f'{{core="{core[1]}"}}'
+    help = f"Collector metric {name}."
+    for suffix, unit in _UNITS:
+        if name.endswith(suffix):
+            return f"autosense_{name[:-len(suffix)]}{unit}", help, ""
+    if name in _PERCENT:
+        return f"autosense_{name}_percent", help, ""
+    return f"autosense_{name}", help, ""
+
+
+def _metric(lines, name, kind, help, samples):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{labels} {value}")
+
+
+def render(stats, score, remediation, stages=None):
+    # Prometheus text exposition for one collector snapshot plus the
+    # pipeline latency histograms (latency.to_json() shaped, by default
+    # this process's)
+    lines = []
+    for m in METRICS:
+        _metric(lines, f"autosense_{m}_percent", "gauge", f"{m.upper()} usage in percent.", [("", stats[m])])
+
+    families = {}
+    for k in sorted(k for k in stats if k not in METRICS and k not in _SKIP):
+        family, help, labels = _family(k)
+        families.setdefault((family, help), []).append((labels, stats[k]))
+    for (family, help), samples in families.items():
+        _metric(lines, family, "gauge", help, samples)
+
+    _metric(lines, "autosense_health_score", "gauge", "Health score from 5 to 100.", [("", score)])
+    _metric(lines, "autosense_anomaly", "gauge", "1 if the latest sample was flagged as anomalous.",
+            [("", int(stats.get("anomaly", 0)))])
+    _metric(lines, "autosense_processes_killed_total", "counter", "Processes terminated by auto_fix.",
+            [("", remediation["killed"])])
+    _metric(lines, "autosense_remediation_runs_total", "counter", "auto_fix runs.",
+            [("", remediation["runs"])])
+    _metric(lines, "autosense_samples_total", "counter", "Samples published by the collector.",
+            [("", stats["seq"])])
+    _metric(lines, "autosense_sample_timestamp_seconds", "gauge", "Time the latest sample was taken.",
+            [("", stats["ts"])])
+    _metric(lines, "autosense_sample_interval_seconds", "gauge", "Current sampling interval.",
+            [("", stats["interval"])])
+
+    return ("\n".join(lines) + "\n" + latency.render_prometheus(stages)).encode()
+
+
+def compress(body):
+    return gzip.compress(body, compresslevel=6, mtime=0)
@@ -1,40 +1,42 @@
+import time
 import psutil
-from control import get_blacklist
+from control import is_blacklisted, refresh
 from notifier import send_alert
 from alert_manager import should_alert
+from procs import ProcessSampler
+
+WHITELIST = {"system", "explorer.exe", "python.exe", "chrome.exe"}
+
+sampler = ProcessSampler()
+
+# CPU% is the delta between two snapshots taken this far apart, so it
+# reflects what each process is doing now rather than since the last run
+MIN_WINDOW = 0.2
+
+
+def _measure():
+    # Runs on the remediation worker, off the request path, so it can wait
+    sampler.snapshot()
+    time.sleep(MIN_WINDOW)
+    return sampler.snapshot()
 
-WHITELIST = ["system", "explorer.exe", "python.exe", "chrome.exe"]
 
 def auto_fix(anomaly):
     if not anomaly:
         return []
 
-    bl = [b.lower() for b in get_blacklist()["apps"]]
     killed = []
+    refresh()
 
-    # Warm-up CPU counters
-    for p in psutil.process_iter():
-        try:
-            p.cpu_percent()
-        except:
-            pass
+    # Two passes over the process table with one short wait between them,
+    # instead of sleeping per process
+    _measure()
 
-    for proc in psutil.process_iter(['pid', 'name', 'memory_percent']):
+    for proc in sampler.kill_candidates(is_blacklisted, cpu=25, mem=20, exclude=WHITELIST):
         try:
-            name = proc.info['name']
-            if not name:
-                continue
-
-            lname = name.lower()
-            cpu = proc.cpu_percent(interval=0.1)
-            mem = proc.info['memory_percent']
-
-            if lname in bl and lname not in WHITELIST:
-                if cpu > 25 or mem > 20:
-                    psutil.Process(proc.info['pid']).terminate()
-                    killed.append(name)
-
-        except:
+            psutil.Process(proc.pid).terminate()
+            killed.append(proc.name)
+        except psutil.Error:
             pass
 
     # Alert only when state changes + cooldown
@@ -0,0 +1,92 @@
+import math, time
+import numpy as np
+import storage
+import archive
+from ring import ring
+from database import METRICS
+from rollup import pick_tier
+
+MAX_POINTS = 300
+
+
+def get_history(start=None, end=None, step=None, metrics=METRICS, max_points=MAX_POINTS):
+    end = time.time() if end is None else end
+    start = end - 3600 if start is None else start
+
+    # Never return more than max_points buckets per series
+    step = max(math.ceil(step or 1), math.ceil((end - start) / max_points), 1)
+    resolution, table, _ = pick_tier(start, step)
+    step = max(step, resolution)
+
+    # Rows are (bucket, first ts, then avg/min/max per metric). Recent
+    # windows come straight from the ring buffer, including samples the
+    # writer hasn't flushed yet.
+    if table == storage.RAW_TABLE and ring.covers(start):
+        rows = _bucket_arrays(ring.range(start, end), start, step, metrics)
+    elif table == storage.RAW_TABLE and archive.overlaps(start, end):
+        data = archive.raw_arrays(start, end, tuple(metrics) + ("interval",))
+        rows = _bucket_arrays(data, start, step, metrics)
+    else:
+        rows = _bucket_sql(start, end, step, metrics, resolution, table)
+
+    result = {
+        "from": start,
+        "to": end,
+        "step": step,
+        "resolution": resolution,
+        "t": [r[1] for r in rows],
+    }
+    for i, m in enumerate(metrics):
+        col = 2 + i * 3
+        result[m] = {
+            "avg": [round(r[col], 2) for r in rows],
+            "min": [round(r[col + 1], 2) for r in rows],
+            "max": [round(r[col + 2], 2) for r in rows],
+        }
+
+    return result
+
+
+def _bucket_sql(start, end, step, metrics, resolution, table):
+    query = storage.query
+    if table == storage.RAW_TABLE:
+        query, table = storage.query_raw, "{raw}"
+        ts = "ts / 1000"
+        where = "ts >= ? AND ts < ?"
+        args = [int(start * 1000), int(end * 1000)]
+        scale = storage.SCALE
+        columns = [f"SUM({m} * COALESCE(interval, 1000)) * 1.0 / SUM(COALESCE(interval, 1000)) / {scale}, "
+                   f"MIN({m}) * 1.0 / {scale}, MAX({m}) * 1.0 / {scale}"
+                   for m in metrics]
+    else:
+        ts = "bucket"
+        where = "bucket >= ? AND bucket < ?"
+        args = [int(start // resolution * resolution), int(end)]
+        columns = [f"SUM({m}_avg * COALESCE(seconds, samples)) / SUM(COALESCE(seconds, samples)), "
+                   f"MIN({m}_min), MAX({m}_max)"
+                   for m in metrics]
+
+    # min/max bucketing: one row per step keeps spikes visible when zoomed out
+    sql = (f"SELECT ({ts} - ?) / ? AS b, MIN({ts}), {', '.join(columns)} "
+           f"FROM {table} WHERE {where} GROUP BY b ORDER BY b")
+
+    return query(sql, [int(start), step] + args)
+
+
+def _bucket_arrays(data, start, step, metrics):
+    # The raw-tier query of _bucket_sql over NumPy columns (ring records or
+    # decoded archive blocks plus live rows)
+    if not len(data["ts"]):
+        return []
+
+    ts = np.floor(data["ts"]).astype(np.int64)
+    keys, first, idx = np.unique((ts - int(start)) // step, return_index=True, return_inverse=True)
+    weight = np.nan_to_num(data["interval"], nan=1.0)
+    total = np.bincount(idx, weight)
+
+    columns = [keys, ts[first]]
+    for m in metrics:
+        values = data[m]
+        columns += [np.bincount(idx, values * weight) / total,
+                    np.minimum.reduceat(values, first), np.maximum.reduceat(values, first)]
+    return list(zip(*(c.tolist() for c in columns)))
@@ -0,0 +1,97 @@
+import threading, time
+from bisect import bisect_left
+
+# Upper bounds in seconds, 50us .. 10s
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC = "autosense_stage_seconds"
+
+_lock = threading.Lock()
+_stages = {}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram.
+
+    Every thread increments its own cell, so observing takes no lock; cells
+    are only summed when a snapshot is read. A cell is
+    [bucket counts..., +Inf count, sum].
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.bounds = buckets
+        self._local = threading.local()
+        self._cells = []
+
+    def _cell(self):
+        cell = [0] * (len(self.bounds) + 1) + [0.0]
+        self._local.cell = cell
+        with _lock:
+            self._cells.append(cell)
+        return cell
+
+    def observe(self, seconds):
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._cell()
+        cell[bisect_left(self.bounds, seconds)] += 1
+        cell[-1] += seconds
+
+    def since(self, start):
+        # Observe the time since `start` and return now, so stages chain:
+        #   t = perf_counter(); ...; t = a.since(t); ...; t = b.since(t)
+        now = time.perf_counter()
+        self.observe(now - start)
+        return now
+
+    def snapshot(self):
+        with _lock:
+            cells = list(self._cells)
+
+        counts = [0] * (len(self.bounds) + 1)
+        total = 0.0
+        for cell in cells:
+            for i in range(len(counts)):
+                counts[i] += cell[i]
+            total += cell[-1]
+
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+
+def stage(name):
+    hist = _stages.get(name)
+    if hist is None:
+        with _lock:
+            hist = _stages.setdefault(name, Histogram())
+    return hist
+
+
+def to_json():
+    result = {}
+    for name, hist in sorted(_stages.items()):
+        snap = hist.snapshot()
+        snap["le"] = list(hist.bounds) + ["+Inf"]
+        snap["mean"] = snap["sum"] / snap["count"] if snap["count"] else 0.0
+        result[name] = snap
+    return result
+
+
+def render_prometheus(stages=None):
+    # stages as returned by to_json(), which is the default
+    stages = to_json() if stages is None else stages
+    lines = [
+        f"# HELP {METRIC} Latency of AutoSense pipeline stages in seconds.",
+        f"# TYPE {METRIC} histogram",
+    ]
+    for name, snap in sorted(stages.items()):
+        for le, count in zip(snap["le"], snap["buckets"]):
+            lines.append(f'{METRIC}_bucket{{stage="{name}",le="{le}"}} {count}')
+        lines.append(f'{METRIC}_sum{{stage="{name}"}} {snap["sum"]}')
+        lines.append(f'{METRIC}_count{{stage="{name}"}} {snap["count"]}')
+    return "\n".join(lines) + "\n"
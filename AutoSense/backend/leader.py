@@ -0,0 +1,61 @@
+# Collector process for multi-worker deployments. It owns sampling, DB
+# writes, model training and remediation, and publishes its state to
+# shared memory for API workers started with AUTOSENSE_ROLE=worker:
+#
+#   python leader.py &
+#   AUTOSENSE_ROLE=worker uvicorn main:app --workers 4
+
+import signal, threading, time
+from monitor import log_stats, stop_stats, on_sample, scheduler
+from anomaly import start_trainer, stop_trainer
+from remediation import worker as remediation
+from shm import SharedState
+import selfmon
+import latency
+
+# /self and the latency histograms change slowly; refresh them in the
+# shared state at most this often rather than on every sample
+REPORT_INTERVAL = 1.0
+
+
+def main():
+    shared = SharedState(create=True)
+    reports = {"at": None}
+    # Sample seqs and result ids restart with every leader; workers use the
+    # epoch to tell a restarted leader's numbers from the old one's
+    epoch = time.time_ns()
+
+    def publish(stats):
+        now = time.monotonic()
+        if reports["at"] is None or now - reports["at"] >= REPORT_INTERVAL:
+            reports.update(at=now, self=selfmon.report(), latency=latency.to_json())
+        shared.publish({
+            "epoch": epoch,
+            "stats": stats,
+            "results": remediation.recent(),
+            "counters": remediation.counters,
+            "scheduler": scheduler.stats(),
+            "self": reports["self"],
+            "latency": reports["latency"],
+        })
+
+    on_sample(publish)
+    start_trainer()
+    remediation.start()
+    threading.Thread(target=log_stats, daemon=True).start()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    while not stop.wait(1):
+        pass
+
+    # Flush buffered samples before the process exits
+    stop_stats()
+    stop_trainer()
+    remediation.stop()
+    shared.close()
+
+
+if __name__ == "__main__":
+    main()
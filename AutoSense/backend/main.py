@@ -1,19 +1,44 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import os
+import re
 import threading
+import time
+from contextlib import asynccontextmanager
 
-from monitor import log_stats, get_stats
 from health_score import calculate_health
-from anomaly import detect_anomaly
-from control import add_blacklist, get_blacklist
-from fix_engine import auto_fix
-from notifier import send_alert
-from alert_manager import should_alert
+from anomaly import detect_range, start_trainer, stop_trainer, reload_model
+from control import add_blacklist, get_blacklist, remove_blacklist
 from report import generate_report
+from history import get_history
+from database import METRICS
+from broadcast import Broadcaster
+from singleflight import SingleFlight
+import selfmon
+import latency
+import exporter
+import profiler
+from shm import SharedState, Unavailable
 
-app = FastAPI()
+# "standalone" runs the collector in this process. "worker" only serves
+# the state that leader.py publishes, so any number of workers can run.
+ROLE = os.environ.get("AUTOSENSE_ROLE", "standalone")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Flush buffered samples before the process exits
+    if ROLE != "worker":
+        stop_stats()
+        stop_trainer()
+        remediation.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,8 +51,157 @@ app.add_middleware(
 # Serve frontend
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Background system logger
-threading.Thread(target=log_stats, daemon=True).start()
+broadcaster = Broadcaster()
+
+# Concurrent /health callers for the same sample share one computation
+health_cache = SingleFlight(ttl=5.0)
+
+# Rendered /metrics bodies, one plain and one gzipped per sample
+metrics_cache = SingleFlight(ttl=60.0, max_entries=4)
+
+HEALTH = latency.stage("health")
+HEALTH_STATS = latency.stage("health_get_stats")
+HEALTH_KILLS = latency.stage("health_recent_kills")
+HEALTH_SCORE = latency.stage("health_score")
+
+
+def health_payload(stats, killed, result_id):
+    # Detection and remediation already ran on the collector and the
+    # remediation worker; this only reads their latest results
+    cpu = stats["cpu"]
+    ram = stats["ram"]
+    disk = stats["disk"]
+    anomaly = stats.get("anomaly", 0)
+
+    score = calculate_health(cpu, ram, disk, anomaly)
+    status = "System Normal" if score > 70 else "System At Risk"
+
+    return {
+        "score": score,
+        "status": status,
+        "anomaly": anomaly,
+        "killed": killed,
+        "seq": stats["seq"],
+        # Pass back as ?since to get only results that finished after this
+        "result_id": result_id
+    }
+
+
+if ROLE == "worker":
+    # Workers never import monitor or remediation: schema setup, the
+    # collector, the writer and the process sampler belong to the leader
+    shared = SharedState()
+    leader_epoch = shared.epoch
+    get_stats = shared.get_stats
+    recent_results = shared.recent
+    last_result_id = shared.last_result_id
+    remediation_counters = shared.counters
+    scheduler_stats = shared.scheduler_stats
+    self_report = shared.self_report
+    # Collector stages come from the leader, request stages from this worker
+    latency_stages = lambda: {**shared.latency(), **latency.to_json()}
+else:
+    from monitor import log_stats, get_stats, stop_stats, on_sample, scheduler
+    from remediation import worker as remediation
+    leader_epoch = lambda: 0
+    recent_results = remediation.recent
+    last_result_id = lambda: remediation.last_id
+    remediation_counters = lambda: remediation.counters
+    scheduler_stats = scheduler.stats
+    self_report = selfmon.report
+    latency_stages = latency.to_json
+
+
+# Without ?since, /health reports auto_fix results from this many seconds
+# before the sample; they land one or more samples after their trigger
+KILL_WINDOW = float(os.environ.get("AUTOSENSE_KILL_WINDOW", 30))
+
+
+def recent_kills(since, stats):
+    # (names killed by results after `since`, id of the newest result)
+    results = recent_results()
+    last = results[-1]["id"] if results else 0
+    if since is not None and since > last:
+        # An id from before a leader restart; everything is new since then
+        since = 0
+    if since is None:
+        results = [r for r in results if r["ts"] >= stats["ts"] - KILL_WINDOW]
+    else:
+        results = [r for r in results if r["id"] > since]
+    return [name for r in results for name in r["killed"]], last
+
+
+def _health(stats, since):
+    t = time.perf_counter()
+    killed, result_id = recent_kills(since, stats)
+    t = HEALTH_KILLS.since(t)
+    payload = health_payload(stats, killed, result_id)
+    HEALTH_SCORE.since(t)
+    return payload
+
+
+_stream_since = 0
+_stream_epoch = None
+
+
+def _broadcast(stats):
+    # Each remediation result is sent to stream clients exactly once
+    global _stream_since, _stream_epoch
+    epoch = leader_epoch()
+    if epoch != _stream_epoch:
+        # A restarted leader numbers its results from 1 again
+        _stream_since, _stream_epoch = 0, epoch
+    results = recent_results(_stream_since)
+    if results:
+        _stream_since = results[-1]["id"]
+    killed = [name for r in results for name in r["killed"]]
+
+    broadcaster.publish({
+        "stats": {m: stats[m] for m in METRICS},
+        "health": health_payload(stats, killed, _stream_since)
+    })
+
+
+FOLLOW_INTERVAL = 0.05
+MODEL_CHECK_INTERVAL = 5.0
+
+
+def _follow():
+    # Workers get no collector callbacks: watch the shared snapshot for new
+    # samples and the model file for newly saved detectors
+    latest = None
+    checked = 0.0
+    while True:
+        try:
+            stats = shared.get_stats()
+            sample = (shared.epoch(), stats["seq"])
+            if sample != latest:
+                latest = sample
+                _broadcast(stats)
+        except Unavailable:
+            pass
+        except Exception as e:
+            print(f"Following shared state failed: {e}")
+
+        if time.monotonic() - checked > MODEL_CHECK_INTERVAL:
+            checked = time.monotonic()
+            reload_model()
+        time.sleep(FOLLOW_INTERVAL)
+
+
+if ROLE == "worker":
+    threading.Thread(target=_follow, name="follow-leader", daemon=True).start()
+else:
+    # Background system logger
+    on_sample(_broadcast)
+    threading.Thread(target=log_stats, daemon=True).start()
+    start_trainer()
+    remediation.start()
+
+
+@app.exception_handler(Unavailable)
+def unavailable(request, exc):
+    return JSONResponse({"detail": str(exc)}, status_code=503)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -41,38 +215,150 @@ def stats():
     return get_stats()
 
 
+@app.get("/scheduler")
+def scheduler_endpoint():
+    return scheduler_stats()
+
+
+@app.get("/self")
+def self_stats():
+    return self_report()
+
+
+@app.get("/debug/profile")
+def debug_profile(seconds: float = 5, mode: str = "wall", hz: float = profiler.HZ):
+    # Blocks this worker thread for the duration of the profile
+    if not profiler.ENABLED:
+        raise HTTPException(404, "Profiler is disabled (set AUTOSENSE_PROFILER=1)")
+    if mode not in profiler.MODES:
+        raise HTTPException(400, f"mode must be one of: {', '.join(profiler.MODES)}")
+    if not 0 < seconds <= profiler.MAX_SECONDS:
+        raise HTTPException(400, f"seconds must be in (0, {profiler.MAX_SECONDS}]")
+    if not 1 <= hz <= 1000:
+        raise HTTPException(400, "hz must be between 1 and 1000")
+
+    try:
+        body = profiler.profile(seconds, mode, hz)
+    except profiler.Busy:
+        raise HTTPException(409, "A profile is already running")
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return Response(body, media_type="text/plain")
+
+
+@app.get("/latency")
+def latency_stats():
+    return latency_stages()
+
+
+def metrics_body(stats, gzipped, epoch):
+    if gzipped:
+        return exporter.compress(metrics_cache.do((epoch, stats["seq"], False),
+                                                  lambda: metrics_body(stats, False, epoch)))
+    score = calculate_health(stats["cpu"], stats["ram"], stats["disk"], stats.get("anomaly", 0))
+    return exporter.render(stats, score, remediation_counters(), latency_stages())
+
+
+@app.get("/metrics")
+def metrics(request: Request):
+    # Scrapes between two samples are served from memory
+    stats = get_stats()
+    gzipped = "gzip" in request.headers.get("accept-encoding", "")
+    epoch = leader_epoch()
+    body = metrics_cache.do((epoch, stats["seq"], gzipped), lambda: metrics_body(stats, gzipped, epoch))
+    headers = {"Vary": "Accept-Encoding"}
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type=exporter.CONTENT_TYPE, headers=headers)
+
+
 @app.get("/health")
-def health():
+def health(since: int = None):
+    start = time.perf_counter()
     stats = get_stats()
+    HEALTH_STATS.since(start)
+    # A result finishing between two samples changes the answer too
+    key = (leader_epoch(), stats["seq"], since, last_result_id())
+    payload = health_cache.do(key, lambda: _health(stats, since))
+    HEALTH.since(start)
+    return payload
 
-    cpu = stats["cpu"]
-    ram = stats["ram"]
-    disk = stats["disk"]
 
-    anomaly = detect_anomaly(cpu, ram, disk)
+@app.get("/health/cache")
+def health_cache_stats():
+    return health_cache.counters
 
-    if should_alert(anomaly) and anomaly:
-        send_alert("AutoSense Warning", "Unusual system behavior detected!")
 
-    killed = auto_fix(anomaly)
+@app.get("/stream")
+async def stream(request: Request):
+    # Server-sent events: one message per collector sample, shared by all clients
+    subscriber = broadcaster.subscribe()
+    queue = subscriber[1]
 
-    score = calculate_health(cpu, ram, disk, anomaly)
-    status = "System Normal" if score > 70 else "System At Risk"
+    async def events():
+        try:
+            if broadcaster.last:
+                yield broadcaster.last
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), 15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/history")
+def history(
+    start: float = Query(None, alias="from"),
+    end: float = Query(None, alias="to"),
+    step: float = None,
+    metrics: str = ",".join(METRICS)
+):
+    names = [m for m in metrics.split(",") if m]
+    unknown = [m for m in names if m not in METRICS]
+    if unknown:
+        raise HTTPException(400, f"Unknown metrics: {', '.join(unknown)}")
+    if not names:
+        raise HTTPException(400, "No metrics requested")
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(400, "'from' must be before 'to'")
+
+    return get_history(start, end, step, names)
 
-    return {
-        "score": score,
-        "status": status,
-        "anomaly": anomaly,
-        "killed": killed
-    }
+
+@app.get("/anomalies")
+def anomalies(
+    start: float = Query(None, alias="from"),
+    end: float = Query(None, alias="to")
+):
+    end = time.time() if end is None else end
+    start = end - 3600 if start is None else start
+    if start >= end:
+        raise HTTPException(400, "'from' must be before 'to'")
+
+    return detect_range(start, end)
 
 
 @app.get("/blacklist/{app_name}")
 def blacklist(app_name: str):
-    add_blacklist(app_name)
+    try:
+        add_blacklist(app_name)
+    except re.error as e:
+        raise HTTPException(400, f"Invalid pattern: {e}")
     return {"message": f"{app_name} added to blacklist"}
 
 
+@app.delete("/blacklist/{app_name}")
+def unblacklist(app_name: str):
+    if not remove_blacklist(app_name):
+        raise HTTPException(404, f"{app_name} is not blacklisted")
+    return {"message": f"{app_name} removed from blacklist"}
+
+
 @app.get("/blacklist")
 def fetch_blacklist():
     return JSONResponse(get_blacklist())
@@ -80,5 +366,6 @@ def fetch_blacklist():
 
 @app.get("/report")
 def report():
-    file = generate_report()
+    with selfmon.track("report"):
+        file = generate_report()
     return FileResponse(file, filename="AutoSense_Report.pdf")
@@ -1,27 +1,134 @@
-import psutil, sqlite3, time
-from database import init_db
+import os, time, threading
+from database import init_db, StatsWriter, METRICS
+from rollup import Rollup
+import archive
+from anomaly import observe
+from remediation import worker as remediation
+from scheduler import Scheduler
+from collectors import collect_due
+from adaptive import AdaptiveRate
+import selfmon
+import latency
+import storage
+from ring import ring
+from selfmon import budget
 
 init_db()
 
+# Latest snapshot published by the collector loop. Readers only ever see a
+# complete dict because the reference is swapped in one assignment.
+_latest = None
+_seq = 0
+_lock = threading.Lock()
+_listeners = []
+
+# Latest value of every metric; collectors that didn't run this tick carry
+# their previous value forward
+_current = {}
+
+SAMPLE_INTERVAL = float(os.environ.get("AUTOSENSE_SAMPLE_INTERVAL", 1))
+scheduler = Scheduler()
+rate = AdaptiveRate(idle=float(os.environ.get("AUTOSENSE_IDLE_INTERVAL", SAMPLE_INTERVAL)))
+_interval = rate.interval
+BUDGET_INTERVAL = float(os.environ.get("AUTOSENSE_BUDGET_SECONDS", 10))
+
+# With the archive on, raw rows leave the raw table by being sealed
+# rather than by the raw retention prune
+_archive = archive.Archive() if archive.ENABLED else None
+writer = StatsWriter(
+    batch_size=int(os.environ.get("AUTOSENSE_FLUSH_ROWS", 60)),
+    flush_interval=float(os.environ.get("AUTOSENSE_FLUSH_SECONDS", 5)),
+    rollup=Rollup(prune_raw=_archive is None),
+    archive=_archive
+)
+
+
+def collect(skip_optional=False):
+    now = time.time()
+    fresh = collect_due(now, skip_optional)
+    _current.update(fresh)
+
+    stats = dict(_current)
+    stats["ts"] = now
+    stats["interval"] = _interval
+    return stats, fresh
+
+
+def publish(stats):
+    global _latest, _seq
+    with _lock:
+        _seq += 1
+        stats["seq"] = _seq
+        _latest = stats
+    return stats
+
+
+def sample():
+    return publish(collect()[0])
+
+
+def on_sample(callback):
+    # callback(stats) runs on the collector thread after every published sample
+    _listeners.append(callback)
+
+
 def get_stats():
-    return {
-        "cpu": psutil.cpu_percent(interval=1),
-        "ram": psutil.virtual_memory().percent,
-        "disk": psutil.disk_usage("/").percent
-    }
+    snapshot = _latest
+    if snapshot is None:
+        snapshot = sample()
+    return dict(snapshot)
+
+
+COLLECT = latency.stage("collector_collect")
+DETECT = latency.stage("collector_detect")
+DISPATCH = latency.stage("collector_dispatch")
+NOTIFY = latency.stage("collector_listeners")
+
+
+def tick():
+    with selfmon.track("collector"):
+        _tick()
 
-def log_stats():
-    while True:
-        stats = get_stats()
 
-        conn = sqlite3.connect("autosense.db")
-        c = conn.cursor()
+def _tick():
+    global _interval
+    t = time.perf_counter()
+    stats, fresh = collect(budget.skip_optional)
+    t = COLLECT.since(t)
+    stats["anomaly"] = observe(stats)
+    t = DETECT.since(t)
+    publish(stats)
+    ring.append(stats)
+
+    # Sample faster while something looks wrong, slower when idle, and
+    # back off further while AutoSense itself is over its CPU budget
+    interval = rate.update(stats, stats["anomaly"]) * budget.interval_scale
+    if interval != _interval:
+        _interval = interval
+        scheduler.set_interval("system", interval)
+
+    # Alerting and auto_fix happen on the remediation worker
+    remediation.report(stats, stats["anomaly"])
+    writer.add(stats, {k: v for k, v in fresh.items() if k not in METRICS})
+    t = DISPATCH.since(t)
+
+    for callback in _listeners:
+        try:
+            callback(stats)
+        except Exception as e:
+            print(f"Sample listener failed: {e}")
+    NOTIFY.since(t)
+
+
+def log_stats():
+    writer.start()
+    scheduler.add("system", _interval, tick)
+    scheduler.add("selfmon", BUDGET_INTERVAL, budget.check)
+    scheduler.run()
 
-        c.execute(
-            "INSERT INTO system_stats (cpu, ram, disk) VALUES (?,?,?)",
-            (stats["cpu"], stats["ram"], stats["disk"])
-        )
 
-        conn.commit()
-        conn.close()
-        time.sleep(1)
+def stop_stats():
+    scheduler.stop()
+    writer.close()
+    storage.close()
+    ring.flush()
@@ -0,0 +1,59 @@
+import time
+from collections import namedtuple
+import psutil
+from collectors import backend as default_backend
+
+Proc = namedtuple("Proc", "pid name cpu rss mem")
+
+
+class ProcessSampler:
+    """One-pass process table with CPU% from deltas between snapshots.
+
+    Each snapshot walks the backend's process table once and never sleeps.
+    A PID's CPU% is the change in its user+system time since the previous
+    snapshot; a PID seen for the first time falls back to its lifetime
+    average.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or default_backend
+        self.total_memory = psutil.virtual_memory().total
+        self.procs = []
+        self.taken_at = None
+        self._times = {}  # pid -> (create_time, cpu seconds)
+
+    def snapshot(self):
+        return self.update(self.backend.process_rows(), time.time())
+
+    def update(self, rows, now):
+        prev_times, prev_at = self._times, self.taken_at
+        times = {}
+        procs = []
+        mem_scale = 100.0 / self.total_memory
+
+        for pid, name, created, cpu_time, rss in rows:
+            times[pid] = (created, cpu_time)
+            prev = prev_times.get(pid)
+
+            # A reused PID has a different create_time; treat it as new
+            if prev is not None and prev[0] == created and now > prev_at:
+                cpu = (cpu_time - prev[1]) / (now - prev_at) * 100
+            elif created and now > created:
+                cpu = cpu_time / (now - created) * 100
+            else:
+                cpu = 0.0
+
+            procs.append(Proc(pid, name, cpu, rss, rss * mem_scale))
+
+        self._times = times
+        self.procs = procs
+        self.taken_at = now
+        return procs
+
+    def kill_candidates(self, match, cpu=25, mem=20, exclude=()):
+        # match(name) decides blacklisting; exclude is a lower-cased set
+        return [
+            p for p in self.procs
+            if p.name and (p.cpu > cpu or p.mem > mem)
+            and p.name.lower() not in exclude and match(p.name)
+        ]
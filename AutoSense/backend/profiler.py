@@ -0,0 +1,97 @@
+import os, sys, threading, time
+
+ENABLED = os.environ.get("AUTOSENSE_PROFILER", "0") == "1"
+HZ = float(os.environ.get("AUTOSENSE_PROFILE_HZ", 100))
+MAX_SECONDS = 60
+MAX_STACKS = 5000  # distinct stacks kept; the rest are counted as truncated
+MAX_DEPTH = 64
+MODES = ("wall", "cpu")
+
+_busy = threading.Lock()
+_labels = {}
+
+
+class Busy(Exception):
+    pass
+
+
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+def _stack(name, frame):
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(name)
+    return ";".join(reversed(labels))
+
+
+def _thread_cpu(ident):
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (OSError, ProcessLookupError):
+        return None
+
+
+def profile(seconds, mode="wall", hz=HZ):
+    """Samples every thread's stack for `seconds` and returns collapsed
+    stacks ("thread;outer;...;inner count" per line) for flamegraph tools.
+
+    In wall mode each line counts samples. In cpu mode a thread is only
+    charged while it is running, and counts are CPU microseconds.
+    """
+    if mode == "cpu" and not hasattr(time, "pthread_getcpuclockid"):
+        raise ValueError("cpu mode is not supported on this platform")
+    if not _busy.acquire(blocking=False):
+        raise Busy()
+
+    try:
+        counts = {}
+        truncated = 0
+        cpu_seen = {}
+        me = threading.get_ident()
+        period = 1.0 / hz
+        deadline = time.monotonic() + min(seconds, MAX_SECONDS)
+        next_at = time.monotonic()
+
+        while next_at < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+
+                weight = 1
+                if mode == "cpu":
+                    now = _thread_cpu(ident)
+                    last = cpu_seen.get(ident)
+                    cpu_seen[ident] = now
+                    if now is None or last is None:
+                        continue
+                    weight = int((now - last) * 1e6)
+                    if weight <= 0:
+                        continue
+
+                stack = _stack(names.get(ident, f"thread-{ident}"), frame)
+                if stack in counts:
+                    counts[stack] += weight
+                elif len(counts) < MAX_STACKS:
+                    counts[stack] = weight
+                else:
+                    truncated += weight
+
+            next_at += period
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        _busy.release()
+
+    lines = [f"{stack} {count}" for stack, count in sorted(counts.items())]
+    if truncated:
+        lines.append(f"[truncated] {truncated}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,111 @@
+import os, queue, threading, time
+from collections import deque
+from alert_manager import should_alert
+from notifier import send_alert
+from fix_engine import auto_fix
+import selfmon
+import latency
+
+ALERT = latency.stage("remediation_alert")
+
+MIN_INTERVAL = float(os.environ.get("AUTOSENSE_FIX_INTERVAL", 10))
+
+
+class RemediationWorker:
+    """Runs alerting and auto_fix off the request path.
+
+    The collector submits anomaly events into a bounded queue. While an
+    event is still waiting, new ones are merged into it instead of queued,
+    and auto_fix runs at most once every `min_interval` seconds.
+    """
+
+    def __init__(self, maxsize=8, min_interval=MIN_INTERVAL, history=50):
+        self.min_interval = min_interval
+        self.results = deque(maxlen=history)
+        self.last_id = 0  # results are numbered in the order they finish
+        self.counters = {"submitted": 0, "merged": 0, "dropped": 0, "rate_limited": 0, "runs": 0, "killed": 0}
+
+        self._queue = queue.Queue(maxsize)
+        self._pending = None
+        self._lock = threading.Lock()
+        self._last_run = 0.0
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="remediation", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(5)
+            self._thread = None
+
+    def submit(self, event):
+        with self._lock:
+            self.counters["submitted"] += 1
+            if self._pending is not None:
+                # Deduplicate: fold into the event that hasn't run yet
+                self._pending["alert"] = self._pending["alert"] or event["alert"]
+                self._pending["seq"] = event["seq"]
+                self.counters["merged"] += 1
+                return True
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self.counters["dropped"] += 1
+                return False
+            self._pending = event
+            return True
+
+    def report(self, stats, anomaly):
+        # Called by the collector on every sample; cheap unless anomalous
+        alert = should_alert(anomaly) and anomaly
+        if anomaly:
+            self.submit({"seq": stats["seq"], "ts": stats["ts"], "alert": bool(alert)})
+
+    def recent(self, since=None):
+        # Results with an id above `since`; seq is the triggering sample
+        results = list(self.results)
+        if since is not None:
+            results = [r for r in results if r["id"] > since]
+        return results
+
+    def _handle(self, event):
+        if event["alert"]:
+            t = time.perf_counter()
+            send_alert("AutoSense Warning", "Unusual system behavior detected!")
+            ALERT.since(t)
+
+        now = time.monotonic()
+        if now - self._last_run < self.min_interval:
+            self.counters["rate_limited"] += 1
+            return
+
+        self._last_run = now
+        with selfmon.track("remediation"):
+            killed = auto_fix(1)
+        self.counters["runs"] += 1
+        self.counters["killed"] += len(killed)
+        self.results.append({"id": self.last_id + 1, "seq": event["seq"], "ts": time.time(), "killed": killed})
+        self.last_id += 1
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+
+            with self._lock:
+                if self._pending is event:
+                    self._pending = None
+
+            try:
+                self._handle(event)
+            except Exception as e:
+                print(f"Remediation failed: {e}")
+
+
+worker = RemediationWorker()
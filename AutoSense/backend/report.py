@@ -1,6 +1,9 @@
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
-import sqlite3
+import time
+from rollup import query_range
+
+REPORT_WINDOW = 24 * 3600
 
 def generate_report():
     doc = SimpleDocTemplate("autosense_report.pdf")
@@ -10,15 +13,22 @@ def generate_report():
     story.append(Paragraph("AutoSense – AI System Intelligence Report", styles["Title"]))
     story.append(Spacer(1,10))
 
-    conn = sqlite3.connect("autosense.db")
-    c = conn.cursor()
-    rows = c.execute("SELECT cpu, ram, disk FROM system_stats ORDER BY id DESC LIMIT 100").fetchall()
-    conn.close()
+    # Per-minute rollups cover the window in at most 1440 rows
+    now = time.time()
+    _, rows = query_range(now - REPORT_WINDOW, now, step=60)
+
+    if not rows:
+        story.append(Paragraph("Not enough data collected yet.", styles["BodyText"]))
+        doc.build(story)
+        return "autosense_report.pdf"
 
-    avg_cpu = sum(r[0] for r in rows)/len(rows)
-    avg_ram = sum(r[1] for r in rows)/len(rows)
-    avg_disk = sum(r[2] for r in rows)/len(rows)
+    # Weighted by the time each row covers (adaptive sampling varies it)
+    seconds = sum(r[4] for r in rows)
+    avg_cpu = sum(r[1] * r[4] for r in rows)/seconds
+    avg_ram = sum(r[2] * r[4] for r in rows)/seconds
+    avg_disk = sum(r[3] * r[4] for r in rows)/seconds
 
+    story.append(Paragraph("Last 24 hours", styles["Heading2"]))
     story.append(Paragraph(f"Average CPU Usage: {round(avg_cpu,2)}%", styles["BodyText"]))
     story.append(Paragraph(f"Average RAM Usage: {round(avg_ram,2)}%", styles["BodyText"]))
     story.append(Paragraph(f"Average Disk Usage: {round(avg_disk,2)}%", styles["BodyText"]))
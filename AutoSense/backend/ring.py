@@ -0,0 +1,170 @@
+import os, time
+import numpy as np
+import storage
+
+RING_PATH = os.environ.get("AUTOSENSE_RING_PATH", os.path.join(os.path.dirname(storage.DB_PATH), "autosense.ring"))
+RING_SIZE = int(os.environ.get("AUTOSENSE_RING_SIZE", 4 * 3600))
+
+RECORD = np.dtype([
+    ("ts", "<f8"),
+    ("cpu", "<f4"),
+    ("ram", "<f4"),
+    ("disk", "<f4"),
+    ("interval", "<f4"),  # NaN when unknown
+    ("anomaly", "<i4"),
+])
+
+MAGIC = int.from_bytes(b"ASRING01", "little")
+VERSION = 1
+HEADER = 64  # bytes: magic, version, capacity, record size, count, padding
+_MAGIC, _VERSION, _CAPACITY, _ITEMSIZE, _COUNT = range(5)
+RECHECK_SECONDS = 1.0
+
+
+class RingBuffer:
+    """Fixed-size file of the most recent samples, mapped into memory.
+
+    Records are written in place at `count % capacity` and the header's
+    total count is bumped afterwards, so any thread or process mapping the
+    same file sees every record up to that count. Reads return NumPy views
+    of the mapping where the requested records are contiguous; a reader
+    holding a view of the oldest records may see them overwritten once
+    the writer wraps around, so copy anything kept for long.
+
+    Only the process that appends creates (or re-creates) the file. Every
+    other process maps it read-only with the capacity in its header, and
+    treats a missing or unrecognised file as an empty ring.
+    """
+
+    def __init__(self, path=RING_PATH, capacity=RING_SIZE):
+        self.path = path
+        self.capacity = capacity  # as mapped; a reader takes the file's
+        self._size = HEADER + capacity * RECORD.itemsize  # what the writer creates
+        self.writable = False
+        self._header = None
+        self.records = None
+        self._inode = None
+        self._checked = None
+
+    def _header_of(self, size=None):
+        # (capacity, inode) of a complete file with our layout, else None
+        try:
+            st = os.stat(self.path)
+            header = np.fromfile(self.path, dtype="<u8", count=_COUNT)
+        except OSError:
+            return None
+        if len(header) < _COUNT or (header[_MAGIC], header[_VERSION], header[_ITEMSIZE]) \
+                != (MAGIC, VERSION, RECORD.itemsize):
+            return None
+        capacity = int(header[_CAPACITY])
+        if st.st_size != HEADER + capacity * RECORD.itemsize or size not in (None, st.st_size):
+            return None
+        return capacity, st.st_ino
+
+    def _map(self, capacity, mode):
+        self._header = np.memmap(self.path, dtype="<u8", mode=mode, shape=(HEADER // 8,))
+        self.records = np.memmap(self.path, dtype=RECORD, mode=mode, offset=HEADER, shape=(capacity,))
+        self.capacity = capacity
+
+    def open_writer(self):
+        size = self._size
+        capacity = (size - HEADER) // RECORD.itemsize
+        if self._header_of(size) is None:
+            # Built next to the target and renamed in, so a reader never
+            # maps a half-initialised file
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as f:
+                f.truncate(size)
+                f.write(np.array([MAGIC, VERSION, capacity, RECORD.itemsize, 0], dtype="<u8").tobytes())
+            os.replace(tmp, self.path)
+        self._map(capacity, "r+")
+        self.writable = True
+        return self
+
+    def _mapped(self):
+        # Readers re-check the file at most once a second, which picks up a
+        # writer that started later or re-created the file
+        if self.writable:
+            return True
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < RECHECK_SECONDS:
+            return self.records is not None
+        self._checked = now
+
+        found = self._header_of()
+        if found is None:
+            self._header = self.records = self._inode = None
+        elif found[1] != self._inode:
+            self._map(found[0], "r")
+            self._inode = found[1]
+        return self.records is not None
+
+    def __len__(self):
+        if not self._mapped():
+            return 0
+        return min(int(self._header[_COUNT]), self.capacity)
+
+    def append(self, stats):
+        if not self.writable:
+            self.open_writer()
+        count = int(self._header[_COUNT])
+        interval = stats.get("interval")
+        self.records[count % self.capacity] = (
+            stats["ts"], stats["cpu"], stats["ram"], stats["disk"],
+            np.nan if interval is None else interval, stats.get("anomaly", 0)
+        )
+        self._header[_COUNT] = count + 1
+
+    def _segments(self):
+        # Stored records, oldest first, as one or two views
+        if not self._mapped():
+            return []
+        count = int(self._header[_COUNT])
+        if count <= self.capacity:
+            return [self.records[:count]]
+        head = count % self.capacity
+        return [self.records[head:], self.records[:head]]
+
+    @staticmethod
+    def _join(parts):
+        parts = [p for p in parts if len(p)]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD)
+
+    def oldest(self):
+        segments = self._segments()
+        if not segments or not len(segments[0]):
+            return None
+        return float(segments[0]["ts"][0])
+
+    def window(self, n):
+        # The latest n records
+        parts, left = [], n
+        for seg in reversed(self._segments()):
+            if left <= 0:
+                break
+            parts.insert(0, seg[max(len(seg) - left, 0):])
+            left -= len(seg)
+        return self._join(parts)
+
+    def range(self, start, end):
+        # Records with start <= ts < end
+        parts = []
+        for seg in self._segments():
+            ts = seg["ts"]
+            parts.append(seg[np.searchsorted(ts, start):np.searchsorted(ts, end)])
+        return self._join(parts)
+
+    def covers(self, start):
+        oldest = self.oldest()
+        return oldest is not None and oldest <= start
+
+    def flush(self):
+        if not self.writable:
+            return
+        self.records.flush()
+        self._header.flush()
+
+
+ring = RingBuffer()
@@ -0,0 +1,227 @@
+import os, time
+import numpy as np
+import storage
+import archive
+from database import METRICS, ROLLUP_TABLES
+
+RAW_RETENTION = float(os.environ.get("AUTOSENSE_RAW_RETENTION", 24 * 3600))
+MINUTE_RETENTION = float(os.environ.get("AUTOSENSE_1M_RETENTION", 30 * 24 * 3600))
+PRUNE_BATCH = int(os.environ.get("AUTOSENSE_PRUNE_BATCH", 500))
+# Raw samples aggregated per writer flush while catching up on history
+# that predates the live rollup
+BACKFILL_ROWS = int(os.environ.get("AUTOSENSE_BACKFILL_ROWS", 20000))
+
+# (resolution in seconds, table, retention in seconds or None for forever),
+# finest first
+# Raw history reaches back as far as the archive keeps sealed hours
+TIERS = [
+    (1, storage.RAW_TABLE, archive.ARCHIVE_RETENTION if archive.ENABLED else RAW_RETENTION),
+    (60, ROLLUP_TABLES[60], MINUTE_RETENTION),
+    (3600, ROLLUP_TABLES[3600], None),
+]
+
+
+def p95(values, weights):
+    # Weighted: the value below which 95% of the covered time falls
+    pairs = sorted(zip(values, weights))
+    target = 0.95 * sum(weights)
+    seen = 0.0
+    for value, weight in pairs:
+        seen += weight
+        if seen >= target:
+            return value
+    return pairs[-1][0]
+
+
+class _Bucket:
+    # Samples are weighted by their sampling interval so a burst of fast
+    # samples during an anomaly doesn't dominate the averages
+    def __init__(self, start):
+        self.start = start
+        self.values = {m: [] for m in METRICS}
+        self.weights = []
+
+    def add(self, stats):
+        for m in METRICS:
+            self.values[m].append(stats[m])
+        self.weights.append(stats.get("interval") or 1.0)
+
+    def row(self):
+        w = self.weights
+        total = sum(w)
+        row = [self.start, len(w)]
+        for m in METRICS:
+            v = self.values[m]
+            row += [min(v), sum(a * b for a, b in zip(v, w)) / total, max(v), p95(v, w)]
+        row.append(total)
+        return tuple(row)
+
+
+class Rollup:
+    """Incrementally aggregates samples into the 1m and 1h tables.
+
+    `add` returns the (table, row) pairs for buckets that closed with that
+    sample; the writer stores them in the same transaction as the raw rows.
+
+    `rolled_up` (epoch ms, persisted in the meta table) marks how far raw
+    history is covered by the 1m/1h tables. Raw rows from before the live
+    rollup started are backfilled up to it, and nothing newer is ever
+    pruned or sealed.
+    """
+
+    def __init__(self, raw_retention=RAW_RETENTION, minute_retention=MINUTE_RETENTION,
+                 prune_batch=PRUNE_BATCH, prune_raw=True, backfill_rows=BACKFILL_ROWS):
+        self.raw_retention = raw_retention
+        self.prune_raw = prune_raw
+        self.minute_retention = minute_retention
+        self.prune_batch = prune_batch
+        self.backfill_rows = backfill_rows
+        self.rolled_up = 0
+        self._live_from = None  # epoch ms where the live rollup took over
+        self._open = {}
+
+    def add(self, stats):
+        ts = stats.get("ts", time.time())
+        finished = []
+
+        for resolution, table in ROLLUP_TABLES.items():
+            start = int(ts // resolution * resolution)
+            bucket = self._open.get(resolution)
+
+            if bucket is not None and bucket.start != start:
+                finished.append((table, bucket.row()))
+                bucket = None
+            if bucket is None:
+                bucket = self._open[resolution] = _Bucket(start)
+
+            bucket.add(stats)
+
+        return finished
+
+    def drain(self):
+        # Closes the open buckets as they are
+        finished = [(ROLLUP_TABLES[resolution], bucket.row()) for resolution, bucket in self._open.items()]
+        self._open = {}
+        return finished
+
+    def resume(self):
+        # Rebuild the open buckets from raw rows written before a restart so
+        # the current minute and hour are not aggregated from a partial set.
+        # Everything before the current hour is left to backfill.
+        now = time.time()
+        hour = now // 3600 * 3600
+        row = storage.query("SELECT value FROM meta WHERE key = 'rolled_up'")
+        self.rolled_up = row[0][0] if row else 0
+        self._live_from = int(hour * 1000)
+        rows = storage.raw_range(hour, now + 1)
+
+        finished = []
+        for ts, cpu, ram, disk, interval in rows:
+            finished += self.add({"cpu": cpu, "ram": ram, "disk": disk, "ts": ts, "interval": interval})
+        return finished
+
+    @property
+    def caught_up(self):
+        return self._live_from is not None and self.rolled_up >= self._live_from
+
+    def _mark(self, conn, ms):
+        self.rolled_up = max(self.rolled_up, ms)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rolled_up', ?)", (self.rolled_up,))
+
+    def written(self, conn, buckets):
+        # Called in the transaction that stores `buckets`: closed live hours
+        # extend the rolled-up range once the backfill has caught up
+        ends = [row[0] + 3600 for table, row in buckets if table == ROLLUP_TABLES[3600]]
+        if ends and self.caught_up:
+            self._mark(conn, max(ends) * 1000)
+
+    def _next_hour(self, conn):
+        # Oldest hour at or after rolled_up with live or sealed raw rows
+        first = conn.execute(
+            f"SELECT MIN(ts) FROM {storage.RAW_TABLE} WHERE ts >= ?", (self.rolled_up,)
+        ).fetchone()[0]
+        sealed = conn.execute(
+            "SELECT MIN(hour) FROM archive_blocks WHERE hour >= ?", (self.rolled_up // 1000,)
+        ).fetchone()[0]
+        hours = [h for h in (None if first is None else first // 3600000 * 3600, sealed) if h is not None]
+        return min(hours) if hours else None
+
+    def backfill(self, conn):
+        # Whole hours, oldest first, until about backfill_rows samples are
+        # done. Buckets the live rollup already wrote are kept.
+        done = 0
+        while not self.caught_up and done < self.backfill_rows:
+            hour = self._next_hour(conn)
+            if hour is None or hour * 1000 >= self._live_from:
+                self._mark(conn, self._live_from)
+                break
+
+            data = archive.raw_arrays(hour, hour + 3600)
+            interval = np.nan_to_num(data["interval"], nan=1.0)
+            hourly = Rollup()
+            buckets = []
+            for ts, cpu, ram, disk, weight in zip(data["ts"].tolist(), data["cpu"].tolist(),
+                                                  data["ram"].tolist(), data["disk"].tolist(),
+                                                  interval.tolist()):
+                buckets += hourly.add({"cpu": cpu, "ram": ram, "disk": disk, "ts": ts, "interval": weight})
+            for table, bucket in buckets + hourly.drain():
+                conn.execute(f"INSERT OR IGNORE INTO {table} VALUES ({','.join('?' * len(bucket))})", bucket)
+
+            self._mark(conn, (hour + 3600) * 1000)
+            done += len(interval)
+        return done
+
+    def prune(self, conn):
+        # One small batch per call; each subquery only walks the oldest rows
+        # of the primary key. Runs inside the caller's write transaction.
+        # Raw rows are only dropped once they are rolled up.
+        now = time.time()
+        # Legacy rows still have to be migrated before backfill can see them
+        if not storage.has_legacy():
+            self.backfill(conn)
+        # Without prune_raw, raw rows leave through the archive instead
+        if self.prune_raw:
+            conn.execute(
+                f"DELETE FROM {storage.RAW_TABLE} WHERE ts IN "
+                f"(SELECT ts FROM {storage.RAW_TABLE} WHERE ts < ? ORDER BY ts LIMIT ?)",
+                (min(int((now - self.raw_retention) * 1000), self.rolled_up), self.prune_batch)
+            )
+        conn.execute(
+            "DELETE FROM metric_samples WHERE (ts, name) IN "
+            "(SELECT ts, name FROM metric_samples WHERE ts < ? LIMIT ?)",
+            (int((now - self.raw_retention) * 1000), self.prune_batch)
+        )
+        conn.execute(
+            f"DELETE FROM {ROLLUP_TABLES[60]} WHERE bucket IN "
+            f"(SELECT bucket FROM {ROLLUP_TABLES[60]} ORDER BY bucket LIMIT ?) AND bucket < ?",
+            (self.prune_batch, int(now - self.minute_retention))
+        )
+
+
+def pick_tier(start, step=1, now=None):
+    # Coarsest table whose resolution still fits in `step` and that retains
+    # data back to `start`; falls back to the finest table that does.
+    now = time.time() if now is None else now
+    covering = [t for t in TIERS if t[2] is None or start >= now - t[2]]
+    fitting = [t for t in covering if t[0] <= step]
+    if fitting:
+        return fitting[-1]
+    return covering[0]
+
+
+def query_range(start, end, step=1):
+    resolution, table, _ = pick_tier(start, step)
+
+    # Rows are (ts, *METRICS, weight in seconds)
+    if table == storage.RAW_TABLE:
+        data = archive.raw_arrays(start, end)
+        weight = np.nan_to_num(data["interval"], nan=1.0)
+        rows = list(zip(data["ts"].tolist(), *(data[m].tolist() for m in METRICS), weight.tolist()))
+    else:
+        rows = storage.query(
+            f"SELECT bucket, {', '.join(m + '_avg' for m in METRICS)}, COALESCE(seconds, samples) "
+            f"FROM {table} WHERE bucket >= ? AND bucket < ? ORDER BY bucket",
+            (int(start // resolution * resolution), int(end))
+        )
+
+    return resolution, rows
@@ -0,0 +1,109 @@
+import math, threading, time
+
+
+class Scheduler:
+    """Runs jobs on absolute, wall-clock aligned deadlines.
+
+    A job with interval 0.5 fires at .0 and .5 of every second, one with
+    interval 60 at the top of every minute. Deadlines advance by whole
+    intervals from the first aligned one, so time spent in the job or in
+    oversleeping never accumulates into drift. A deadline passed by more
+    than `tolerance` (default: half the interval, capped at 50 ms) is
+    skipped and counted as missed instead of being run late.
+    """
+
+    def __init__(self, clock=time.time, wait=None, tolerance=0.05):
+        self.clock = clock
+        self.tolerance = tolerance
+        self.jobs = []
+        self._stop = threading.Event()
+        self._wait = wait or self._stop.wait
+
+    def add(self, name, interval, fn):
+        job = {
+            "name": name,
+            "interval": interval,
+            "fn": fn,
+            "ticks": 0,
+            "missed": 0,
+            "last_lateness": 0.0,
+            "max_lateness": 0.0,
+            "total_lateness": 0.0,
+        }
+        self._anchor(job)
+        self.jobs.append(job)
+        return job
+
+    def set_interval(self, name, interval):
+        # Takes effect from the next aligned boundary of the new interval
+        for job in self.jobs:
+            if job["name"] == name and job["interval"] != interval:
+                job["interval"] = interval
+                self._anchor(job)
+
+    def stop(self):
+        self._stop.set()
+
+    def _anchor(self, job):
+        # Deadlines are anchor + k * interval rather than a running sum, so
+        # float rounding can't accumulate either
+        interval = job["interval"]
+        job["anchor"] = math.ceil(self.clock() / interval) * interval
+        job["k"] = 0
+        job["next"] = job["anchor"]
+
+    def run(self):
+        while not self._stop.is_set() and self.jobs:
+            job = min(self.jobs, key=lambda j: j["next"])
+            delay = job["next"] - self.clock()
+
+            interval = job["interval"]
+            tolerance = min(interval / 2, self.tolerance)
+
+            if delay > interval:
+                # Wall clock stepped backwards; re-anchor instead of stalling
+                self._anchor(job)
+                continue
+            if delay < -tolerance:
+                # Overran past whole deadlines: skip to the first one that
+                # can still be met on time
+                missed = math.ceil((-delay - tolerance) / interval)
+                job["missed"] += missed
+                self._advance(job, missed)
+                continue
+            if delay > 0 and self._wait(delay):
+                return
+
+            self._tick(job)
+
+    def _advance(self, job, steps):
+        job["k"] += steps
+        job["next"] = job["anchor"] + job["k"] * job["interval"]
+
+    def _tick(self, job):
+        lateness = max(self.clock() - job["next"], 0.0)
+
+        job["ticks"] += 1
+        job["last_lateness"] = lateness
+        job["total_lateness"] += lateness
+        job["max_lateness"] = max(job["max_lateness"], lateness)
+        self._advance(job, 1)
+
+        try:
+            job["fn"]()
+        except Exception as e:
+            print(f"Scheduled job {job['name']} failed: {e}")
+
+    def stats(self):
+        return [
+            {
+                "name": j["name"],
+                "interval": j["interval"],
+                "ticks": j["ticks"],
+                "missed": j["missed"],
+                "last_lateness_ms": round(j["last_lateness"] * 1000, 3),
+                "max_lateness_ms": round(j["max_lateness"] * 1000, 3),
+                "mean_lateness_ms": round(j["total_lateness"] / j["ticks"] * 1000, 3) if j["ticks"] else 0.0,
+            }
+            for j in self.jobs
+        ]
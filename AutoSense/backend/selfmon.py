@@ -0,0 +1,124 @@
+import gc, os, threading, time
+from contextlib import contextmanager
+import psutil
+import latency
+
+CPU_BUDGET = float(os.environ.get("AUTOSENSE_CPU_BUDGET", 1.0))  # % of one core
+RSS_BUDGET = float(os.environ.get("AUTOSENSE_RSS_BUDGET_MB", 256)) * 1024 * 1024
+MAX_LEVEL = 4
+
+_process = psutil.Process()
+_lock = threading.Lock()
+_subsystems = {}
+_gc = {"collections": 0, "total_pause": 0.0, "max_pause": 0.0}
+_gc_started = {}
+
+
+@contextmanager
+def track(name):
+    # Wall and on-thread CPU time spent inside the block, per subsystem
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.thread_time() - cpu
+        latency.stage(name).observe(wall)
+        with _lock:
+            entry = _subsystems.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += wall
+            entry[2] += cpu
+
+
+def _on_gc(phase, info):
+    if phase == "start":
+        _gc_started[threading.get_ident()] = time.perf_counter()
+        return
+    started = _gc_started.pop(threading.get_ident(), None)
+    if started is None:
+        return
+    pause = time.perf_counter() - started
+    _gc["collections"] += 1
+    _gc["total_pause"] += pause
+    _gc["max_pause"] = max(_gc["max_pause"], pause)
+
+
+gc.callbacks.append(_on_gc)
+
+
+class Budget:
+    """Keeps the agent's own CPU use under `cpu_budget` percent of a core
+    and its resident memory under `rss_budget` bytes.
+
+    `check` is run periodically. Each time CPU usage over the last period
+    or the current RSS is above budget the degradation level goes up one
+    step; each time both are well below (half the CPU budget, 90% of the
+    RSS budget) it comes back down one step. Level 1 skips optional
+    collectors, every level above that doubles the sampling interval.
+    """
+
+    def __init__(self, cpu_budget=CPU_BUDGET, rss_budget=RSS_BUDGET):
+        self.cpu_budget = cpu_budget
+        self.rss_budget = rss_budget
+        self.level = 0
+        self.cpu_percent = 0.0
+        self.rss = 0
+        self._last = None
+
+    def check(self):
+        # The first call only sets the baseline, so startup cost is not counted
+        now, cpu = time.monotonic(), time.process_time()
+        last, self._last = self._last, (now, cpu)
+        if last is None or now <= last[0]:
+            return self.level
+
+        last_now, last_cpu = last
+
+        self.cpu_percent = (cpu - last_cpu) / (now - last_now) * 100
+        self.rss = _process.memory_info().rss
+        if self.cpu_percent > self.cpu_budget or self.rss > self.rss_budget:
+            self.level = min(self.level + 1, MAX_LEVEL)
+        elif self.cpu_percent < self.cpu_budget / 2 and self.rss < self.rss_budget * 0.9:
+            self.level = max(self.level - 1, 0)
+        return self.level
+
+    @property
+    def skip_optional(self):
+        return self.level >= 1
+
+    @property
+    def interval_scale(self):
+        return 2 ** max(self.level - 1, 0)
+
+
+budget = Budget()
+
+
+def report():
+    times = _process.cpu_times()
+    with _lock:
+        subsystems = {
+            name: {"calls": calls, "wall_ms": round(wall * 1000, 3), "cpu_ms": round(cpu * 1000, 3)}
+            for name, (calls, wall, cpu) in _subsystems.items()
+        }
+
+    return {
+        "cpu_seconds": round(times.user + times.system, 3),
+        "cpu_percent": round(budget.cpu_percent, 3),
+        "rss_bytes": _process.memory_info().rss,
+        "threads": _process.num_threads(),
+        "gc": {
+            "collections": _gc["collections"],
+            "total_pause_ms": round(_gc["total_pause"] * 1000, 3),
+            "max_pause_ms": round(_gc["max_pause"] * 1000, 3),
+        },
+        "subsystems": subsystems,
+        "budget": {
+            "cpu_percent": budget.cpu_budget,
+            "rss_bytes": int(budget.rss_budget),
+            "level": budget.level,
+            "skip_optional": budget.skip_optional,
+            "interval_scale": budget.interval_scale,
+        },
+    }
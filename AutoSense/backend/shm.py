@@ -0,0 +1,136 @@
+import json, os, struct, time
+from multiprocessing import shared_memory
+
+SHM_NAME = os.environ.get("AUTOSENSE_SHM_NAME", "autosense")
+SHM_SIZE = int(os.environ.get("AUTOSENSE_SHM_SIZE", 256 * 1024))
+
+# Seqlock counter (odd while a write is in progress), then payload length
+_COUNTER = struct.Struct("<Q")
+_LENGTH = struct.Struct("<Q")
+_HEADER = 16
+
+
+class Unavailable(Exception):
+    pass
+
+
+def _untrack(shm):
+    # The segment outlives any one process: workers stay attached across
+    # leader restarts, so keep Python's resource tracker from unlinking it
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class SharedState:
+    """Latest leader state in shared memory, published under a seqlock.
+
+    One process (the leader) publishes; any number of processes read
+    without taking a lock. A reader retries if the counter was odd or
+    changed while it copied the payload, and decodes each version once.
+    """
+
+    def __init__(self, name=SHM_NAME, size=SHM_SIZE, create=False):
+        self.name = name
+        self.size = size
+        self._shm = None
+        self._cached = (None, None)
+        if create:
+            self._shm = self._create()
+
+    def _create(self):
+        try:
+            shm = shared_memory.SharedMemory(self.name, create=True, size=self.size)
+            _COUNTER.pack_into(shm.buf, 0, 0)
+        except FileExistsError:
+            # Reuse the segment of a previous leader so attached workers
+            # keep seeing updates
+            shm = shared_memory.SharedMemory(self.name)
+            if shm.size < self.size:
+                raise RuntimeError(f"Shared memory {self.name} is smaller than {self.size} bytes")
+            counter = _COUNTER.unpack_from(shm.buf, 0)[0]
+            _COUNTER.pack_into(shm.buf, 0, counter + (counter & 1))
+        _untrack(shm)
+        return shm
+
+    def _attach(self):
+        if self._shm is None:
+            try:
+                self._shm = shared_memory.SharedMemory(self.name)
+            except FileNotFoundError:
+                raise Unavailable("The collector process is not running")
+            _untrack(self._shm)
+        return self._shm
+
+    def publish(self, payload):
+        data = json.dumps(payload, separators=(",", ":")).encode()
+        buf = self._shm.buf
+        if _HEADER + len(data) > len(buf):
+            print(f"Shared state of {len(data)} bytes does not fit in {self.name}")
+            return False
+
+        counter = _COUNTER.unpack_from(buf, 0)[0]
+        _COUNTER.pack_into(buf, 0, counter + 1)
+        _LENGTH.pack_into(buf, 8, len(data))
+        buf[_HEADER:_HEADER + len(data)] = data
+        _COUNTER.pack_into(buf, 0, counter + 2)
+        return True
+
+    def read(self):
+        buf = self._attach().buf
+        for _ in range(1000):
+            counter = _COUNTER.unpack_from(buf, 0)[0]
+            if counter == 0:
+                raise Unavailable("The collector has not published a sample yet")
+
+            cached_counter, cached = self._cached
+            if counter == cached_counter:
+                return cached
+            if counter & 1:
+                time.sleep(0)
+                continue
+
+            length = _LENGTH.unpack_from(buf, 8)[0]
+            data = bytes(buf[_HEADER:_HEADER + min(length, len(buf) - _HEADER)])
+            if _COUNTER.unpack_from(buf, 0)[0] == counter:
+                value = json.loads(data)
+                self._cached = (counter, value)
+                return value
+        raise Unavailable("The shared state is being rewritten too often to read")
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    # Read side, shaped like the in-process objects main.py uses
+
+    def epoch(self):
+        return self.read()["epoch"]
+
+    def get_stats(self):
+        return dict(self.read()["stats"])
+
+    def recent(self, since=None):
+        results = self.read()["results"]
+        if since is not None:
+            results = [r for r in results if r["id"] > since]
+        return results
+
+    def last_result_id(self):
+        results = self.read()["results"]
+        return results[-1]["id"] if results else 0
+
+    def counters(self):
+        return self.read()["counters"]
+
+    def scheduler_stats(self):
+        return self.read()["scheduler"]
+
+    def self_report(self):
+        return self.read()["self"]
+
+    def latency(self):
+        return self.read()["latency"]
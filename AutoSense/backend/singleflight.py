@@ -0,0 +1,74 @@
+import threading, time
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent computations of the same key and caches results.
+
+    The first caller for a key runs the function; callers arriving while
+    it is in flight wait for and share its result. Finished results are
+    served from cache for `ttl` seconds. Keys should include whatever
+    makes a result stale (e.g. the collector's sample seq).
+    """
+
+    def __init__(self, ttl=5.0, max_entries=64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._cache = {}
+
+    def do(self, key, fn):
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                self.counters["hits"] += 1
+                return cached[1]
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.counters["misses"] += 1
+            else:
+                self.counters["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if call.error is None:
+                    self._store(key, call.result)
+                else:
+                    self.counters["errors"] += 1
+            call.done.set()
+
+        return call.result
+
+    def _store(self, key, value):
+        now = time.monotonic()
+        if len(self._cache) >= self.max_entries:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            if len(self._cache) >= self.max_entries:
+                self._cache.clear()
+        self._cache[key] = (now + self.ttl, value)
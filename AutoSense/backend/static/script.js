@@ -1,6 +1,7 @@
 let cpuData = [];
 let ramData = [];
 let labels = [];
+let lastResult = null;
 
 const ctx = document.getElementById("sysChart").getContext("2d");
 
@@ -20,10 +21,7 @@ const chart = new Chart(ctx,{
   }
 });
 
-async function loadStats(){
-  const stats = await fetch("/stats").then(r=>r.json());
-  const health = await fetch("/health").then(r=>r.json());
-
+function render(stats, health){
   document.getElementById("cpu").innerText = stats.cpu + "%";
   document.getElementById("ram").innerText = stats.ram + "%";
   document.getElementById("disk").innerText = stats.disk + "%";
@@ -54,5 +52,54 @@ async function loadStats(){
   }
 }
 
-setInterval(loadStats,1000);
-loadStats();
+async function loadStats(){
+  const stats = await fetch("/stats").then(r=>r.json());
+  const health = await fetch(lastResult === null ? "/health" : `/health?since=${lastResult}`).then(r=>r.json());
+  lastResult = health.result_id;
+  render(stats, health);
+}
+
+function startPolling(){
+  setInterval(loadStats,1000);
+  loadStats();
+}
+
+function startStream(){
+  // One server push per sample; fall back to polling if SSE is unavailable
+  if(!window.EventSource){
+    startPolling();
+    return;
+  }
+
+  const source = new EventSource("/stream");
+  let connected = false;
+
+  source.onopen = ()=>{ connected = true; };
+  source.onmessage = e=>{
+    const msg = JSON.parse(e.data);
+    render(msg.stats, msg.health);
+  };
+  source.onerror = ()=>{
+    if(!connected){
+      source.close();
+      startPolling();
+    }
+  };
+}
+
+async function loadHistory(){
+  // Seed the chart with the last minute from the server instead of starting empty
+  const now = Date.now() / 1000;
+  const history = await fetch(`/history?from=${now - 60}&to=${now}&metrics=cpu,ram`).then(r=>r.json());
+  const n = history.t.length;
+
+  for(let i = Math.max(0, n - 20); i < n; i++){
+    cpuData.push(history.cpu.avg[i]);
+    ramData.push(history.ram.avg[i]);
+    labels.push("");
+  }
+
+  chart.update();
+}
+
+loadHistory().finally(startStream);
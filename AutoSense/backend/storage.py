@@ -0,0 +1,183 @@
+import os, sqlite3, threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Resolved once so the database doesn't depend on the working directory
+DB_PATH = os.path.abspath(os.environ.get(
+    "AUTOSENSE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "autosense.db")
+))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # In WAL mode NORMAL only syncs on checkpoint, not on every commit
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA mmap_size={int(os.environ.get('AUTOSENSE_DB_MMAP', 64 * 1024 * 1024))}",
+    "PRAGMA cache_size=-16000",  # KiB
+    "PRAGMA busy_timeout=5000",
+)
+
+# Raw samples are keyed by epoch ms and store metrics as fixed-point
+# integers (hundredths of a percent) and the interval in ms
+RAW_TABLE = "system_stats_raw"
+SCALE = 100
+
+# Whether the old text-timestamp system_stats table still exists. Its rows
+# are being migrated (by whichever process runs the writer) and reads
+# cover both tables. Once it has been dropped it stays gone, so only a
+# missing table is cached.
+legacy = None
+
+_write_lock = threading.RLock()
+_writer = None
+_local = threading.local()
+
+
+def connect(path=DB_PATH, **kwargs):
+    conn = sqlite3.connect(path, cached_statements=256, **kwargs)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+@contextmanager
+def write():
+    """The single writer connection, in a transaction.
+
+    Writes from every thread go through this one connection, serialized by
+    a lock, so they never contend with each other for SQLite's write lock.
+    """
+    global _writer
+    with _write_lock:
+        if _writer is None:
+            _writer = connect(check_same_thread=False)
+        with _writer:
+            yield _writer
+
+
+def reader():
+    # One read connection per thread; in WAL mode they never block the writer
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = connect()
+    return conn
+
+
+def query(sql, args=()):
+    return reader().execute(sql, args).fetchall()
+
+
+def close():
+    global _writer
+    with _write_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+
+# Typed queries shared by the modules that read raw samples
+
+def has_legacy(conn=None):
+    global legacy
+    if legacy is not False:
+        legacy = (conn or reader()).execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'system_stats'"
+        ).fetchone() is not None
+    return legacy
+
+
+def raw_source(conn=None):
+    # Table expression with the raw layout (ts ms, fixed-point metrics,
+    # interval ms); includes not yet migrated legacy rows
+    if not has_legacy(conn):
+        return RAW_TABLE
+    return (f"(SELECT ts, cpu, ram, disk, interval FROM {RAW_TABLE} UNION ALL "
+            f"SELECT {LEGACY_COLUMNS} FROM system_stats)")
+
+
+def query_raw(sql, args=()):
+    # `sql` reads from "{raw}". The schema check and the query share one
+    # read transaction, so the legacy table can't be dropped in between.
+    conn = reader()
+    conn.execute("BEGIN")
+    try:
+        return conn.execute(sql.format(raw=raw_source(conn)), args).fetchall()
+    finally:
+        conn.execute("COMMIT")
+
+
+LEGACY_COLUMNS = (
+    "CAST(strftime('%s', timestamp) AS INTEGER) * 1000 AS ts, "
+    f"CAST(ROUND(cpu * {SCALE}) AS INTEGER) AS cpu, CAST(ROUND(ram * {SCALE}) AS INTEGER) AS ram, "
+    f"CAST(ROUND(disk * {SCALE}) AS INTEGER) AS disk, CAST(ROUND(interval * 1000) AS INTEGER) AS interval"
+)
+
+_RAW_COLUMNS = f"ts / 1000.0, cpu * 1.0 / {SCALE}, ram * 1.0 / {SCALE}, disk * 1.0 / {SCALE}, interval / 1000.0"
+
+
+def raw_row(stats, ts):
+    interval = stats.get("interval")
+    return (
+        int(ts * 1000),
+        round(stats["cpu"] * SCALE), round(stats["ram"] * SCALE), round(stats["disk"] * SCALE),
+        None if interval is None else round(interval * 1000),
+    )
+
+
+def raw_range(start, end):
+    # [(epoch seconds, cpu, ram, disk, interval)] with start <= ts < end
+    return query_raw(
+        f"SELECT {_RAW_COLUMNS} FROM {{raw}} WHERE ts >= ? AND ts < ? ORDER BY ts",
+        (int(start * 1000), int(end * 1000))
+    )
+
+
+def raw_latest(limit):
+    # The newest `limit` rows as [(epoch seconds, cpu, ram, disk, interval)], oldest first
+    rows = query_raw(f"SELECT {_RAW_COLUMNS} FROM {{raw}} ORDER BY ts DESC LIMIT ?", (limit,))
+    rows.reverse()
+    return rows
+
+
+def metric_series(name, start, end):
+    # [(epoch ms, value)] of one metric_samples series with start <= ts < end (seconds)
+    return query(
+        "SELECT ts, value FROM metric_samples WHERE ts >= ? AND ts < ? AND name = ? ORDER BY ts",
+        (int(start * 1000), int(end * 1000), name)
+    )
+
+
+def blacklist_names():
+    return [r[0] for r in query("SELECT name FROM blacklist ORDER BY id")]
+
+
+# Bumped in the same transaction as every blacklist change, so any process
+# can tell with one primary key lookup whether its cached copy is current
+
+def blacklist_version():
+    row = query("SELECT value FROM meta WHERE key = 'blacklist_version'")
+    return row[0][0] if row else 0
+
+
+def _bump_blacklist(conn):
+    conn.execute("INSERT INTO meta (key, value) VALUES ('blacklist_version', 1) "
+                 "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+
+
+def insert_blacklist(name):
+    with write() as conn:
+        if conn.execute("INSERT OR IGNORE INTO blacklist(name) VALUES(?)", (name,)).rowcount:
+            _bump_blacklist(conn)
+
+
+def delete_blacklist(name):
+    with write() as conn:
+        removed = conn.execute("DELETE FROM blacklist WHERE name = ?", (name,)).rowcount > 0
+        if removed:
+            _bump_blacklist(conn)
+        return removed
+
+
+def format_timestamp(ts):
+    # Same text format as SQLite's CURRENT_TIMESTAMP (UTC)
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+